@@ -0,0 +1,181 @@
+"""Structured JSON access log that never blocks request handling.
+
+``AccessLogMiddleware`` appends one tuple per response to an in-memory ring
+buffer: a ``deque`` appended to without locks. A background writer thread
+wakes every ``FLUSH_INTERVAL`` seconds (or as soon as ``BATCH`` records are
+waiting), serializes the batch to JSON lines and appends it to the log file
+with one ``write()``. The file is rotated at ``TA_ACCESS_LOG_BYTES`` and
+``TA_ACCESS_LOG_BACKUPS`` old files are kept.
+
+When the writer falls behind and the buffer is full, new records are dropped
+and counted in ``ta_access_log_dropped_total`` rather than making requests
+wait. Each line looks like::
+
+    {"ts": 1760900000.123, "worker": 4242, "method": "GET", "path": "/pages/python.html",
+     "route": "/pages/{page_path:path}", "status": 200, "ms": 0.41, "bytes": 28114,
+     "user": "9b2…", "cache": "hit"}
+
+Handlers report ``user`` and ``cache`` (``hit``: served from memory or the
+static export; ``miss``: rendered or read for this request) through
+``note()``; a 304 is always logged as ``revalidated``.
+
+Run uvicorn with ``--no-access-log`` so it stops writing its own synchronous
+line per request. Set ``TA_ACCESS_LOG`` to an empty string to turn logging
+off.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from core.storage import DATA_DIR
+import jsonio
+import metrics
+
+LOG_PATH = os.environ.get('TA_ACCESS_LOG', os.path.join(DATA_DIR, 'logs', 'access.log'))
+CAPACITY = int(os.environ.get('TA_ACCESS_LOG_BUFFER', 65536))
+MAX_BYTES = int(os.environ.get('TA_ACCESS_LOG_BYTES', 50 * 1024 * 1024))
+BACKUPS = int(os.environ.get('TA_ACCESS_LOG_BACKUPS', 5))
+BATCH = 1024
+FLUSH_INTERVAL = 0.5
+
+FIELDS = ('ts', 'worker', 'method', 'path', 'route', 'status', 'ms', 'bytes', 'user', 'cache')
+
+
+def note(scope, **fields):
+    """Attach ``user`` and/or ``cache`` to the access-log record of this request."""
+    scope.setdefault('state', {}).update(fields)
+
+
+class AccessLog:
+    def __init__(self, path=LOG_PATH, capacity=CAPACITY, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer = deque()
+        self.dropped = 0
+        self.written = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def record(self, entry):
+        """Queue one record (a tuple in FIELDS order); never blocks."""
+        if len(self.buffer) >= self.capacity:
+            self.dropped += 1
+            metrics.inc('ta_access_log_dropped_total', (),
+                        help_text='Access-log records dropped because the buffer was full')
+            return
+        self.buffer.append(entry)
+        if len(self.buffer) >= BATCH:
+            self._wake.set()
+
+    def start(self):
+        """Start the writer thread (per process, after any fork)."""
+        if self._thread is not None or not self.enabled:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush what is buffered and stop the writer."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of records written."""
+        written = 0
+        while self.buffer:
+            lines = []
+            while self.buffer and len(lines) < BATCH:
+                lines.append(json.dumps(dict(zip(FIELDS, self.buffer.popleft())), separators=(',', ':')))
+            self._write(('\n'.join(lines) + '\n').encode('utf-8'))
+            written += len(lines)
+        if written:
+            self.written += written
+            metrics.inc('ta_access_log_written_total', (), written,
+                        help_text='Access-log records written to disk')
+        return written
+
+    def _write(self, data):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        # workers share the file; the lock and size re-check make one of them rotate
+        with jsonio.locked(self.path):
+            try:
+                if os.stat(self.path).st_size < self.max_bytes:
+                    return
+            except FileNotFoundError:
+                return
+            for n in range(self.backups - 1, 0, -1):
+                if os.path.exists(f'{self.path}.{n}'):
+                    os.replace(f'{self.path}.{n}', f'{self.path}.{n + 1}')
+            if self.backups:
+                os.replace(self.path, f'{self.path}.1')
+            else:
+                os.remove(self.path)
+
+
+ACCESS_LOG = AccessLog()
+
+
+class AccessLogMiddleware:
+    """ASGI middleware recording one access-log entry per HTTP response."""
+
+    def __init__(self, app, log=ACCESS_LOG):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.log.enabled:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message):
+            nonlocal status, sent
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                sent += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            state = scope.get('state') or {}
+            route = scope.get('route')
+            self.log.record((
+                time.time(), os.getpid(), scope['method'], scope['path'],
+                getattr(route, 'path', None), status,
+                round((time.perf_counter() - start) * 1000, 3), sent,
+                state.get('user'), 'revalidated' if status == 304 else state.get('cache'),
+            ))
@@ -0,0 +1,154 @@
+"""Learner activity: which pages and sections are read, counted per day.
+
+Views are recorded without touching any data file. ``record(key)`` puts the
+key (``/concepts/python-complete-guide`` or, for a section,
+``/concepts/python-complete-guide#waits``) on a bounded ``asyncio.Queue``.
+A background task in each worker drains the queue into in-memory counters
+and every ``TA_ACTIVITY_FLUSH`` seconds merges them into
+``data/activity.json`` under the file lock, in a thread:
+
+    {"2026-10-19": {"/pages/python.html": 812, "/pages/python.html#loops": 97, ...}, ...}
+
+Days older than ``TA_ACTIVITY_DAYS`` are pruned on each merge.
+
+When the queue is full the event is dropped and counted in
+``ta_activity_dropped_total``; ``reserve(n)`` lets the batch endpoint refuse
+a whole batch up front instead, so clients can retry later. Queue depth is
+exported as ``ta_activity_queue_depth``.
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+
+from core.storage import DATA_DIR
+import jsonio
+import metrics
+
+ACTIVITY_FILE = os.path.join(DATA_DIR, 'activity.json')
+QUEUE_SIZE = int(os.environ.get('TA_ACTIVITY_QUEUE', 10000))
+FLUSH_INTERVAL = float(os.environ.get('TA_ACTIVITY_FLUSH', 10))
+KEEP_DAYS = int(os.environ.get('TA_ACTIVITY_DAYS', 90))
+
+
+def today():
+    return time.strftime('%Y-%m-%d', time.gmtime())
+
+
+def merge(path, pending, keep_days=KEEP_DAYS):
+    """Add ``{day: Counter}`` to the counts in ``path``; returns the days kept."""
+    with jsonio.locked(path):
+        try:
+            days, _raw = jsonio.read_file(path)
+        except FileNotFoundError:
+            days = {}
+        for day, counts in pending.items():
+            totals = days.setdefault(day, {})
+            for key, n in counts.items():
+                totals[key] = totals.get(key, 0) + n
+        for day in sorted(days)[:-keep_days]:
+            del days[day]
+        jsonio.write_file(path, days)
+    return days
+
+
+class ActivityLog:
+    def __init__(self, path=ACTIVITY_FILE, maxsize=QUEUE_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.queue = None
+        self.pending = {}  # day -> Counter of keys not yet merged into the file
+        self._task = None
+        self._wake = None
+        self._stopping = False
+
+    def record(self, key, source='server'):
+        """Queue one view; returns False (and counts a drop) when the queue is full."""
+        if self.queue is None:
+            return False
+        try:
+            self.queue.put_nowait(key)
+        except asyncio.QueueFull:
+            metrics.inc('ta_activity_dropped_total', (('source', source),),
+                        help_text='Activity events dropped because the queue was full')
+            return False
+        self._wake.set()
+        metrics.inc('ta_activity_events_total', (('source', source),),
+                    help_text='Activity events queued for rollup')
+        return True
+
+    def reserve(self, n):
+        """True if ``n`` more events fit in the queue right now."""
+        return self.queue is not None and self.maxsize - self.queue.qsize() >= n
+
+    def start(self):
+        """Start the rollup task on the running loop (per worker, after any fork)."""
+        if self._task is not None:
+            return
+        self.queue = asyncio.Queue(self.maxsize)
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the rollup task and merge everything still queued."""
+        if self._task is None:
+            return
+        # signalled rather than cancelled: a cancel racing a wake-up can be lost
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+        self.queue = None
+
+    def _drain(self):
+        metrics.set_gauge('ta_activity_queue_depth', (), self.queue.qsize(),
+                          'Activity events waiting for rollup')
+        counts = self.pending.setdefault(today(), Counter())
+        while not self.queue.empty():
+            counts[self.queue.get_nowait()] += 1
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_flush = loop.time() + self.flush_interval
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, next_flush - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self._drain()
+            if loop.time() >= next_flush:
+                await self.flush()
+                next_flush = loop.time() + self.flush_interval
+        self._drain()
+        await self.flush()
+
+    async def flush(self):
+        """Merge pending counts into the activity file without blocking the loop."""
+        pending = {day: counts for day, counts in self.pending.items() if counts}
+        self.pending = {}
+        if not pending:
+            return
+        with metrics.timer('activity_flush'):
+            try:
+                await asyncio.to_thread(merge, self.path, pending)
+            except OSError:
+                # keep the counts for the next attempt rather than losing them
+                for day, counts in pending.items():
+                    self.pending.setdefault(day, Counter()).update(counts)
+                metrics.inc('ta_activity_flush_errors_total', (),
+                            help_text='Failed merges of activity counts into the data file')
+
+    def summary(self, days=7):
+        """Persisted counts for the last ``days`` days, most read first."""
+        try:
+            stored, _raw = jsonio.read_file(self.path)
+        except FileNotFoundError:
+            return {}
+        return {day: dict(sorted(stored[day].items(), key=lambda item: -item[1]))
+                for day in sorted(stored)[-days:]}
+
+
+ACTIVITY = ActivityLog()
@@ -0,0 +1,187 @@
+"""Minified, content-hashed copies of the site's CSS and JavaScript.
+
+``build_assets()`` minifies every ``assets/css/*.css`` and ``assets/js/*.js``
+file into ``assets/dist/`` under a name carrying a hash of its contents
+(``css/style.3f9c0a1b2d.css``) and records the mapping in
+``assets/dist/manifest.json``. Because a changed file gets a new URL, the
+``/assets/dist/`` tree can be cached by browsers and CDNs for a year.
+
+``asset_url(name)`` and ``rewrite_html(html)`` turn source references into
+hashed URLs. Without a build they fall back to the plain ``/assets/...``
+paths, so an unbuilt checkout keeps working. The static build also stores
+the above-the-fold CSS of each page type (see ``critical_css.py``) in the
+manifest, returned by ``critical_for()``.
+
+Older hashed files are left in place so pages cached before a rebuild can
+still load the assets they reference.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
+DIST_DIR = os.path.join(ASSETS_DIR, 'dist')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+URL_PREFIX = '/assets/'
+SOURCE_DIRS = (('css', '.css'), ('js', '.js'))
+HASH_LENGTH = 10
+# seconds between checks of manifest.json for a newer build
+REVALIDATE_AFTER = 1.0
+
+# src/href values pointing into assets/, written relative ("../assets/..") or absolute
+ASSET_REF = re.compile(r'''(?P<attr>\b(?:href|src)=)(?P<q>["'])(?:\.\./)*/?assets/(?P<name>[\w./-]+?\.(?:css|js))(?P=q)''')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+CSS_COLON = re.compile(r':\s+')
+CSS_LAST_SEMICOLON = re.compile(r';}')
+
+
+def minify_css(text):
+    text = CSS_COMMENT.sub('', text)
+    text = CSS_SPACE.sub(' ', text)
+    text = CSS_PUNCTUATION.sub(r'\1', text)
+    text = CSS_COLON.sub(':', text)
+    return CSS_LAST_SEMICOLON.sub('}', text).strip()
+
+
+def minify_js(text):
+    """Drop comment-only lines, indentation and blank lines.
+
+    Line breaks are kept so automatic semicolon insertion still applies;
+    trailing comments after code are left alone because telling them apart
+    from ``//`` inside strings needs a real tokenizer.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def hashed_name(name, body):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def build_assets(assets_dir=ASSETS_DIR, dist_dir=DIST_DIR):
+    """Minify and fingerprint every source asset; returns the manifest dict.
+
+    The manifest maps source names (``css/style.css``) to dist names, plus
+    ``sizes`` with the source and minified byte counts for reporting.
+    """
+    files = {}
+    sizes = {}
+    for subdir, ext in SOURCE_DIRS:
+        source_dir = os.path.join(assets_dir, subdir)
+        if not os.path.isdir(source_dir):
+            continue
+        for entry in sorted(os.listdir(source_dir)):
+            if not entry.endswith(ext):
+                continue
+            name = f'{subdir}/{entry}'
+            with open(os.path.join(source_dir, entry), 'r', encoding='utf-8') as f:
+                source = f.read()
+            body = MINIFIERS[ext](source).encode('utf-8')
+            target = hashed_name(name, body)
+            path = os.path.join(dist_dir, target)
+            if not os.path.exists(path):
+                _write_atomic(path, body)
+            files[name] = target
+            sizes[name] = [len(source.encode('utf-8')), len(body)]
+    return save_manifest({'files': files, 'sizes': sizes}, dist_dir)
+
+
+def save_manifest(manifest, dist_dir=DIST_DIR):
+    """Write ``manifest`` and make it the current one; returns it."""
+    _write_atomic(os.path.join(dist_dir, 'manifest.json'),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    global _manifest, _manifest_mtime, _manifest_checked
+    _manifest = manifest
+    _manifest_mtime = _stat_manifest()
+    _manifest_checked = time.monotonic()
+    return manifest
+
+
+_manifest = None
+_manifest_mtime = None
+_manifest_checked = 0.0
+
+
+def _stat_manifest():
+    try:
+        return os.stat(MANIFEST_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_manifest():
+    """Return the current manifest ({'files': {}} when assets were never built).
+
+    Re-read when ``manifest.json`` changes, checked at most every
+    ``REVALIDATE_AFTER`` seconds, so pages rendered after a build that ran
+    beside the server use the new URLs and critical CSS.
+    """
+    global _manifest, _manifest_mtime, _manifest_checked
+    now = time.monotonic()
+    if _manifest is not None and now - _manifest_checked < REVALIDATE_AFTER:
+        return _manifest
+    _manifest_checked = now
+    mtime = _stat_manifest()
+    if _manifest is None or mtime != _manifest_mtime:
+        try:
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                _manifest = json.load(f)
+        except FileNotFoundError:
+            _manifest = {'files': {}}
+        _manifest_mtime = mtime
+    return _manifest
+
+
+def asset_url(name):
+    """Absolute URL for a source asset name such as ``css/style.css``."""
+    target = load_manifest()['files'].get(name)
+    if target is None:
+        return URL_PREFIX + name
+    return f'{URL_PREFIX}dist/{target}'
+
+
+def asset_text(url):
+    """Minified text of the asset behind an ``asset_url()`` result."""
+    name = url[len(URL_PREFIX):]
+    with open(os.path.join(ASSETS_DIR, name), 'r', encoding='utf-8') as f:
+        text = f.read()
+    if is_hashed_path(name):
+        return text
+    return MINIFIERS[os.path.splitext(name)[1]](text)
+
+
+def critical_for(page_type):
+    """Inlined above-the-fold CSS for a page type ('' until ``build-assets`` ran)."""
+    return load_manifest().get('critical', {}).get(page_type, '')
+
+
+def is_hashed_path(path):
+    """True for paths under the /assets mount that name a fingerprinted file."""
+    return path.startswith('dist/') and not path.endswith('manifest.json')
+
+
+def rewrite_html(html):
+    """Point every assets/ reference in an HTML document at its hashed URL."""
+    return ASSET_REF.sub(lambda m: f"{m['attr']}{m['q']}{asset_url(m['name'])}{m['q']}", html)
@@ -0,0 +1,114 @@
+"""Hit ratio of the hot cache against a plain LRU on a Zipf-distributed replay.
+
+Usage:
+    python bench_hot_cache.py [requests] [guides] [budget%]   (defaults 200000, 400, 10)
+
+Builds a catalog of ``guides`` URLs whose sizes cycle through the gzip-compressed
+sizes of the real ``pages/*.html`` files and rendered concepts, ranks them by
+popularity (Zipf, s=0.9, so a few guides such as Python and Selenium take
+most of the traffic), and replays ``requests`` lookups through:
+
+- ``hot_cache.HotCache``: TinyLFU admission, entries built from the second request;
+- an LRU with the same byte budget that caches every miss.
+
+Every tenth of the replay a crawler-like scan requests each guide once, in
+catalog order. The budget is ``budget%`` of the total catalog size.
+"""
+import bisect
+import gzip
+import itertools
+import os
+import random
+import sys
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ZIPF_S = 0.9
+
+
+def real_sizes():
+    import hot_cache
+    from core.storage import CONCEPTS
+    from rendering import render_concept
+
+    sizes = []
+    pages_dir = os.path.join(BASE_DIR, 'pages')
+    for name in sorted(os.listdir(pages_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(pages_dir, name), 'rb') as f:
+                sizes.append(len(hot_cache.encode(f.read(), 'gzip')))
+    for concept in CONCEPTS.all():
+        sizes.append(len(gzip.compress(render_concept(concept).encode('utf-8'), compresslevel=6, mtime=0)))
+    return sizes
+
+
+class LRU:
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = 0
+
+    def get(self, url, size):
+        if url in self.entries:
+            self.entries.move_to_end(url)
+            self.hits += 1
+            return
+        self.misses += 1
+        if size > self.budget:
+            return
+        while self.size + size > self.budget:
+            self.size -= self.entries.popitem(last=False)[1]
+        self.entries[url] = size
+        self.size += size
+
+
+def replay(trace, sizes, budget):
+    import hot_cache
+
+    hot = hot_cache.HotCache(budget)
+    lru = LRU(budget)
+    for url in trace:
+        lru.get(url, sizes[url])
+        if hot.get(url, 'gzip', 1) is None and hot.admits(url):
+            hot.put(url, 'gzip', 1, bytes(sizes[url]))
+    return hot.hits / len(trace), lru.hits / len(trace)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    guides = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    percent = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    base = real_sizes()
+    urls = [f'/concepts/guide-{i}' for i in range(guides)]
+    sizes = dict(zip(urls, itertools.cycle(base)))
+    budget = int(sum(sizes.values()) * percent / 100)
+
+    rng = random.Random(42)
+    cumulative = list(itertools.accumulate(1 / rank ** ZIPF_S for rank in range(1, guides + 1)))
+    popular = urls[:]
+    rng.shuffle(popular)  # popularity is unrelated to catalog order
+
+    def zipf():
+        return popular[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+
+    plain = [zipf() for _ in range(n)]
+    scanned = []
+    for chunk in range(10):
+        scanned.extend(plain[chunk * n // 10:(chunk + 1) * n // 10])
+        scanned.extend(urls)
+
+    print(f'{guides} guides, {sum(sizes.values()) / 1024:.0f} KiB compressed, '
+          f'budget {budget / 1024:.0f} KiB ({percent:g}%), Zipf s={ZIPF_S}')
+    print(f'  {"replay":<24} {"hot cache":>10} {"LRU":>10}')
+    results = []
+    for label, trace in ((f'{n} requests', plain), (f'{n} + 10 scans', scanned)):
+        hot, lru = replay(trace, sizes, budget)
+        results.append((hot, lru))
+        print(f'  {label:<24} {hot:>10.1%} {lru:>10.1%}')
+    print(f'✓ hot cache hit ratio {results[1][0]:.1%} vs LRU {results[1][1]:.1%} with scans')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark on-disk JSON formats for a large users.json.
+
+Usage:
+    python bench_json.py [user count]   (default 100000)
+
+Compares the old format (stdlib, indent=2) with compact stdlib output and,
+when installed, orjson: file size, dump time and load time.
+"""
+import json
+import sys
+import time
+from uuid import uuid4
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_users(n):
+    courses = ('general', 'python', 'selenium', 'playwright', 'robotframework')
+    statuses = ('pending', 'approved', 'rejected')
+    users = []
+    for i in range(n):
+        u = {
+            'id': str(uuid4()),
+            'name': f'learner {i}',
+            'email': f'learner{i}@example.com',
+            'course': courses[i % len(courses)],
+            'status': statuses[i % len(statuses)],
+            'registered_at': '2025-12-07T11:31:14.744188Z',
+        }
+        if u['status'] == 'approved':
+            u['approved_at'] = '2025-12-07T11:43:44.474314Z'
+            u['access_token'] = str(uuid4())
+            u['progress'] = {'python': i % 101}
+        users.append(u)
+    return users
+
+
+def best_of(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    users = make_users(n)
+    formats = [
+        ('stdlib indent=2 (old)', lambda: json.dumps(users, indent=2, ensure_ascii=False).encode('utf-8'), json.loads),
+        ('stdlib compact', lambda: json.dumps(users, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), json.loads),
+    ]
+    if orjson is not None:
+        formats.append(('orjson compact', lambda: orjson.dumps(users), orjson.loads))
+    else:
+        print('(orjson not installed; pip install orjson to include it)')
+
+    print(f'{n} users')
+    print(f"{'format':<24}{'size MB':>10}{'dump ms':>10}{'load ms':>10}")
+    for name, dump, load in formats:
+        dump_time, raw = best_of(dump)
+        load_time, _ = best_of(lambda: load(raw))
+        print(f'{name:<24}{len(raw) / 1e6:>10.2f}{dump_time * 1000:>10.1f}{load_time * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Memory per user: plain dicts (as parsed from users.json) vs UserRecord.
+
+Usage:
+    python bench_memory.py [user count]   (default 1000000)
+
+Users are parsed from JSON in batches, as the store does, and memory is
+measured with tracemalloc after each form is fully built.
+"""
+import gc
+import json
+import sys
+import tracemalloc
+
+from bench_json import make_users
+from records import UserRecord
+
+BATCH = 10000
+
+
+def build(n, convert):
+    out = []
+    for start in range(0, n, BATCH):
+        raw = json.dumps(make_users(min(BATCH, n - start)))
+        batch = json.loads(raw)
+        out.extend(convert(batch))
+        del raw, batch
+    return out
+
+
+def measure(n, convert):
+    gc.collect()
+    tracemalloc.start()
+    users = build(n, convert)
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del users
+    gc.collect()
+    return current
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    as_dicts = measure(n, lambda batch: batch)
+    as_records = measure(n, lambda batch: [UserRecord(u) for u in batch])
+    print(f'{n} users')
+    print(f"{'form':<12}{'total MB':>10}{'bytes/user':>12}")
+    print(f"{'dict':<12}{as_dicts / 1e6:>10.1f}{as_dicts / n:>12.0f}")
+    print(f"{'UserRecord':<12}{as_records / 1e6:>10.1f}{as_records / n:>12.0f}")
+    print(f'saving {100 * (1 - as_records / as_dicts):.0f}%')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Throughput of protected tutorial pages against static files, through the ASGI app.
+
+Usage:
+    python bench_pages.py [requests]   (default 5000)
+
+Serves, in-process and one request at a time:
+
+- a protected page for a logged-in learner (session cookie);
+- the same page without credentials (the login redirect);
+- a public page;
+- a stylesheet from the ``/assets`` static mount, the static-file baseline.
+
+The data directory is a scratch one holding a single approved learner.
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def request(app, path, headers):
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': headers, 'client': ('127.0.0.1', 1), 'server': ('127.0.0.1', 80),
+             'root_path': ''}
+    status = None
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    scratch = tempfile.mkdtemp(prefix='ta-pages-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    os.environ.update(TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'))
+    try:
+        import server_fastapi
+        from core import users
+
+        async def run():
+            app = server_fastapi.app
+            async with app.router.lifespan_context(app):
+                users.approve(users.register('Bench', 'bench@example.com'))
+                token, _user = users.login('bench@example.com')
+                cookie = [(b'cookie', f'TA_USER_TOKEN={token}'.encode())]
+                cases = (('protected page, logged in', '/pages/python.html', cookie, 200),
+                         ('protected page, anonymous', '/pages/python.html', [], 307),
+                         ('public page', '/pages/login.html', [], 200),
+                         ('static file', '/assets/css/style.css', [], 200))
+                results = []
+                for label, path, headers, expected in cases:
+                    assert await request(app, path, headers) == expected, label
+                    start = time.perf_counter()
+                    for _ in range(n):
+                        await request(app, path, headers)
+                    results.append((label, n / (time.perf_counter() - start)))
+                return results
+
+        results = asyncio.run(run())
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f'{n} sequential requests per case')
+    for label, rate in results:
+        print(f'  {label:<28} {rate:>9,.0f} req/s')
+    print(f'✓ logged-in pages at {results[0][1] / results[-1][1]:.1f}x the static-file rate')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""Per-worker memory and startup time: spawned workers vs a preloading master.
+
+Usage:
+    python bench_rss.py [worker count] [user count]   (defaults 4, 50000)
+
+Runs three setups against a scratch data directory holding the repo's
+concepts and ``user count`` synthetic users:
+
+    spawn          every worker imports the app itself (``uvicorn --workers``)
+    fork           the master imports and warms the app, then forks
+    fork+freeze    as fork, with gc.freeze() before forking (``gunicorn.conf.py``)
+
+Each worker starts the app lifespan, serves every concept, public page and
+admin listing through the ASGI app, runs a full collection and then idles
+while its /proc/<pid>/smaps_rollup is read. USS (private pages) is the memory
+a worker really adds; PSS splits shared pages between the processes using them.
+"""
+import asyncio
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_json import make_users
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ADMIN = [(b'x-admin-token', b'admin123')]
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+async def request(app, path, headers=()):
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': list(headers), 'client': ('127.0.0.1', 1), 'server': ('127.0.0.1', 80),
+             'root_path': ''}
+    status = None
+    disconnected = asyncio.Event()
+    received = False
+
+    async def receive():
+        # one request body, then block until the response is done, like a real
+        # server; streamed responses listen for the disconnect
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status
+
+
+async def workload(module):
+    app = module.app
+    async with app.router.lifespan_context(app):
+        paths = [f"/concepts/{c['slug']}" for c in module.CONCEPTS.all()]
+        paths += [f'/pages/{name}' for name, page in module.PAGES.pages.items() if page.public]
+        for path in paths + ['/']:
+            await request(app, path)
+        await request(app, '/api/users', ADMIN)
+        await request(app, '/api/concepts', ADMIN)
+        gc.collect()
+
+
+def run_worker(module, started, ready_fd):
+    """Serve the workload, report readiness, then idle until killed."""
+    if module is None:
+        import server_fastapi as module
+    asyncio.run(workload(module))
+    os.write(ready_fd, json.dumps({'pid': os.getpid(), 'startup': time.time() - started}).encode() + b'\n')
+    os.close(ready_fd)
+    while True:
+        time.sleep(60)
+
+
+def run_master(mode, n):
+    """Start ``n`` workers in ``mode`` and print their memory as JSON."""
+    module = None
+    preload_seconds = 0.0
+    if mode != 'spawn':
+        if mode == 'fork+freeze':
+            gc.disable()
+        import preload
+        start = time.perf_counter()
+        module = preload.warm()
+        if mode == 'fork+freeze':
+            preload.freeze()
+        preload_seconds = time.perf_counter() - start
+
+    read_fd, write_fd = os.pipe()
+    children = []
+    for _ in range(n):
+        started = time.time()
+        if mode == 'spawn':
+            children.append(subprocess.Popen(
+                [sys.executable, __file__, '--worker', str(started), str(write_fd)],
+                pass_fds=(write_fd,)))
+            continue
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            run_worker(module, started, write_fd)
+        children.append(pid)
+    os.close(write_fd)
+
+    reports = []
+    with os.fdopen(read_fd) as pipe:
+        for _ in range(n):
+            report = json.loads(pipe.readline())
+            reports.append(report)
+    time.sleep(0.5)
+    for report in reports:
+        report.update(smaps_rollup(report['pid']))
+    for child in children:
+        pid = child.pid if mode == 'spawn' else child
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+    master = smaps_rollup(os.getpid())
+    print(json.dumps({'mode': mode, 'preload': preload_seconds, 'master': master, 'workers': reports}))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    scratch = tempfile.mkdtemp(prefix='ta-rss-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    shutil.copy(os.path.join(BASE_DIR, 'data', 'concepts.json'), data_dir)
+    with open(os.path.join(data_dir, 'users.json'), 'w', encoding='utf-8') as f:
+        json.dump(make_users(users), f)
+    env = dict(os.environ, TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'),
+               TA_SESSION_SECRET='bench-rss')
+    env.pop('TA_BUS_DIR', None)
+    # first run migrates progress out of users.json so every mode sees the same files
+    subprocess.run([sys.executable, '-c', 'import server_fastapi'], cwd=BASE_DIR, env=env, check=True)
+
+    print(f'{n} workers, {users} users, {len(open(os.path.join(data_dir, "concepts.json"), "rb").read())} '
+          f'bytes of concepts')
+    print(f'{"mode":<12} {"RSS/worker":>11} {"PSS/worker":>11} {"USS/worker":>11} '
+          f'{"PSS total":>10} {"ready in":>9}')
+    try:
+        for mode in ('spawn', 'fork', 'fork+freeze'):
+            out = subprocess.run([sys.executable, __file__, '--master', mode, str(n)],
+                                 cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            workers = result['workers']
+            avg = {k: sum(w[k] for w in workers) / len(workers) for k in ('rss', 'pss', 'uss', 'startup')}
+            total_pss = (sum(w['pss'] for w in workers) + result['master']['pss']) / 1024
+            print(f'{mode:<12} {avg["rss"] / 1024:>8.1f} MB {avg["pss"] / 1024:>8.1f} MB '
+                  f'{avg["uss"] / 1024:>8.1f} MB {total_pss:>7.1f} MB {avg["startup"] * 1000:>6.0f} ms'
+                  + (f'  (master preload {result["preload"] * 1000:.0f} ms)' if result['preload'] else ''))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        run_worker(None, float(sys.argv[2]), int(sys.argv[3]))
+    elif sys.argv[1:2] == ['--master']:
+        run_master(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,87 @@
+"""Cold-start latency: process launch to first served request.
+
+Usage:
+    python bench_startup.py [runs] [user count]   (defaults 15, 50000)
+
+Each run starts a fresh interpreter that imports FastAPI, imports
+``server_fastapi``, runs the app lifespan startup and serves one concept page
+through the ASGI app, like the first request after an autoscaler starts a
+worker. The data directory is a scratch copy holding the repo's concepts and
+``user count`` synthetic users; it is warmed by one untimed run so files the
+app creates on first start (progress matrix, session secret) already exist.
+Medians over all runs are printed for each phase.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_json import make_users
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r'''
+import time
+t0 = time.perf_counter()
+import fastapi
+t1 = time.perf_counter()
+import server_fastapi
+t2 = time.perf_counter()
+import asyncio, json, sys
+from bench_rss import request
+
+async def first_request():
+    app = server_fastapi.app
+    t2b = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        t3 = time.perf_counter()
+        status = await request(app, '/concepts/python-complete-guide')
+        return t2b, t3, time.perf_counter(), status
+
+t2b, t3, t4, status = asyncio.run(first_request())
+ready = time.time()
+assert status == 200, status
+print(json.dumps({'launched': float(sys.argv[1]), 'ready': ready, 'framework': t1 - t0,
+                  'app import': t2 - t1, 'lifespan': t3 - t2b, 'first request': t4 - t3}))
+'''
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    scratch = tempfile.mkdtemp(prefix='ta-startup-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    shutil.copy(os.path.join(BASE_DIR, 'data', 'concepts.json'), data_dir)
+    with open(os.path.join(data_dir, 'users.json'), 'w', encoding='utf-8') as f:
+        json.dump(make_users(users), f)
+    env = dict(os.environ, TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'))
+    env.pop('TA_BUS_DIR', None)
+    env.pop('TA_SESSION_SECRET', None)
+    # deployed workers start from bytecode caches; the warm-up run writes them
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def launch():
+        out = subprocess.run([sys.executable, '-c', CHILD, str(time.time())], cwd=BASE_DIR, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        result = json.loads(out)
+        result['import-to-ready'] = result['ready'] - result['launched']
+        return result
+
+    try:
+        launch()
+        results = [launch() for _ in range(runs)]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f'{runs} cold starts, {users} users (median)')
+    for phase in ('framework', 'app import', 'lifespan', 'first request', 'import-to-ready'):
+        print(f'  {phase:<16} {statistics.median(r[phase] for r in results) * 1000:>7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
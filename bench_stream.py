@@ -0,0 +1,119 @@
+"""Time to first byte and peak memory of a live concept page, buffered vs streamed.
+
+Usage:
+    python bench_stream.py [runs] [scale]   (defaults 200, 50)
+
+Serves the largest concept in ``data/concepts.json`` through the ASGI app,
+once with ``STREAM_CONCEPTS`` off (whole document rendered, then sent) and
+once on (head sent first, then one ``<h2>`` section per chunk). A second
+concept holding the largest one's body repeated ``scale`` times shows how
+both grow with page size. The data directory is a scratch copy, no static
+export exists and the hot cache is disabled, so every request renders.
+
+TTFB is the time from calling the app to the first body bytes handed to the
+server; peak memory is the tracemalloc high-water mark of one request,
+measured in separate runs so tracing does not skew the timings.
+"""
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+async def request(app, path):
+    """Serve one GET; returns (seconds to first body bytes, total seconds, bytes)."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': [], 'client': ('127.0.0.1', 1), 'server': ('127.0.0.1', 80), 'root_path': ''}
+    disconnected = asyncio.Event()
+    received = False
+    first = None
+    size = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal first, size
+        if message['type'] == 'http.response.body' and message.get('body'):
+            if first is None:
+                first = time.perf_counter()
+            size += len(message['body'])
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    end = time.perf_counter()
+    disconnected.set()
+    return first - start, end - start, size
+
+
+async def measure(module, path, runs):
+    app = module.app
+    results = {}
+    for label, streamed in (('buffered', False), ('streamed', True)):
+        module.STREAM_CONCEPTS = streamed
+        await request(app, path)  # warm caches
+        timings = [await request(app, path) for _ in range(runs)]
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        await request(app, path)
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = (statistics.median(t[0] for t in timings),
+                          statistics.median(t[1] for t in timings), timings[0][2], peak)
+    return results
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    scale = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with open(os.path.join(BASE_DIR, 'data', 'concepts.json'), 'r', encoding='utf-8') as f:
+        largest = max(json.load(f), key=lambda c: len(c.get('content') or ''))
+    scaled = dict(largest, id=largest['id'] + '-x', slug=f"{largest['slug']}-x{scale}",
+                  content=largest['content'] * scale)
+    scratch = tempfile.mkdtemp(prefix='ta-stream-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, 'concepts.json'), 'w', encoding='utf-8') as f:
+        json.dump([largest, scaled], f)
+    # no hot cache either: every request must render
+    os.environ.update(TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'),
+                      TA_HOT_CACHE_BYTES='0')
+    try:
+        import server_fastapi
+
+        async def run():
+            app = server_fastapi.app
+            async with app.router.lifespan_context(app):
+                return [(c['slug'], await measure(server_fastapi, f"/concepts/{c['slug']}", runs))
+                        for c in (largest, scaled)]
+
+        reports = asyncio.run(run())
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f'{runs} requests per mode (median)')
+    for slug, results in reports:
+        print(f'/concepts/{slug} ({results["buffered"][2] / 1024:.0f} KiB)')
+        for label, (ttfb, total, _size, peak) in results.items():
+            print(f'  {label:<9} ttfb {ttfb * 1000:>7.3f} ms   total {total * 1000:>7.3f} ms   '
+                  f'peak {peak / 1024:>8.1f} KiB')
+        buffered, streamed = results['buffered'], results['streamed']
+        print(f'  ✓ streamed: ttfb {100 * streamed[0] / buffered[0]:.0f}% and '
+              f'peak memory {100 * streamed[3] / buffered[3]:.0f}% of buffered')
+
+
+if __name__ == '__main__':
+    main()
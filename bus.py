@@ -0,0 +1,100 @@
+"""Local pub/sub between worker processes for cache invalidation.
+
+Each worker binds a Unix datagram socket named ``<pid>.sock`` inside
+``TA_BUS_DIR``. ``publish`` sends a small JSON message to every other socket
+in that directory, and the event loop dispatches received messages to the
+handlers registered with ``subscribe``. Sockets left behind by dead workers
+are removed the first time a send to them is refused.
+
+When ``TA_BUS_DIR`` is unset the bus is disabled: ``publish`` is a no-op and
+caches fall back to revalidating against file mtimes.
+"""
+import os
+import socket
+from collections import defaultdict
+
+import jsonio
+import metrics
+
+BUS_DIR = os.environ.get('TA_BUS_DIR')
+
+
+class Bus:
+    def __init__(self, directory=BUS_DIR):
+        self.directory = directory
+        self.path = None
+        self.handlers = defaultdict(list)
+        self.sock = None
+        self._loop = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def subscribe(self, topic, handler):
+        """Call ``handler(message dict)`` for every message on ``topic`` from other workers."""
+        self.handlers[topic].append(handler)
+
+    def start(self, loop):
+        if not self.enabled or self.sock is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # named at start, not import, so workers forked from a preloaded master differ
+        self.path = os.path.join(self.directory, f'{os.getpid()}.sock')
+        try:
+            os.remove(self.path)  # stale socket from a previous process with this pid
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self.path)
+        sock.setblocking(False)
+        self.sock = sock
+        self._loop = loop
+        loop.add_reader(sock.fileno(), self._on_readable)
+
+    def stop(self):
+        if self.sock is None:
+            return
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def publish(self, topic, **data):
+        if self.sock is None:
+            return
+        message = jsonio.dumps(dict(data, topic=topic, pid=os.getpid()))
+        for name in os.listdir(self.directory):
+            peer = os.path.join(self.directory, name)
+            if not name.endswith('.sock') or peer == self.path:
+                continue
+            try:
+                self.sock.sendto(message, peer)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.remove(peer)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                # receiver's queue is full; its mtime fallback will catch up
+                metrics.inc('ta_bus_dropped_total', (('topic', topic),),
+                            help_text='Bus messages dropped because a peer queue was full')
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                message = jsonio.loads(data)
+            except ValueError:
+                continue
+            for handler in self.handlers.get(message.get('topic'), ()):
+                handler(message)
+
+
+BUS = Bus()
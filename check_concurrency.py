@@ -0,0 +1,131 @@
+"""Run the FastAPI and Flask servers against one data directory at once.
+
+Usage:
+    python check_concurrency.py [user count]   (default 300)
+
+Starts ``server_fastapi`` (with the Flask API mounted at ``/legacy``) and a
+standalone ``server.py`` on a scratch data directory, then hammers all three
+surfaces in parallel:
+
+- registrations spread across them must all land in users.json exactly once;
+- the same email registered on every surface at once must succeed only once;
+- approvals and rejections issued through different servers must all stick.
+
+Both servers go through core's locked transactions, so none of these may lose
+or duplicate a write.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FASTAPI_PORT = 7450
+FLASK_PORT = 7451
+ADMIN = {'X-Admin-Token': 'admin123'}
+THREADS = 24
+
+
+def wait_up(url):
+    for _ in range(100):
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    raise SystemExit(f'✗ {url} did not start')
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    scratch = tempfile.mkdtemp(prefix='ta-concurrency-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    users_file = os.path.join(data_dir, 'users.json')
+    env = dict(os.environ, TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'),
+               TA_SESSION_SECRET='concurrency-check', TA_LEGACY_FLASK='1',
+               TA_RATE_LOGIN='100000/1', TA_RATE_REGISTER='100000/1', PORT=str(FLASK_PORT))
+    env.pop('FLASK_DEBUG', None)
+    fastapi_url = f'http://127.0.0.1:{FASTAPI_PORT}'
+    surfaces = {
+        'fastapi': fastapi_url,
+        'legacy mount': f'{fastapi_url}/legacy',
+        'flask': f'http://127.0.0.1:{FLASK_PORT}',
+    }
+    procs = [
+        subprocess.Popen([sys.executable, '-m', 'uvicorn', 'server_fastapi:app', '--port', str(FASTAPI_PORT),
+                          '--log-level', 'warning'], cwd=BASE_DIR, env=env),
+        subprocess.Popen([sys.executable, 'server.py'], cwd=BASE_DIR, env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    try:
+        for url in surfaces.values():
+            wait_up(url + '/')
+        print(f'✓ FastAPI, /legacy and Flask up on {data_dir}')
+        urls = list(surfaces.values())
+        pool = ThreadPoolExecutor(THREADS)
+
+        def register(i, url=None):
+            url = url or urls[i % len(urls)]
+            r = requests.post(f'{url}/api/register', json={'name': f'u{i}', 'email': f'user{i}@example.com'})
+            return r.status_code, r.json().get('id')
+
+        results = list(pool.map(register, range(n)))
+        codes = [code for code, _ in results]
+        assert codes == [201] * n, {c: codes.count(c) for c in set(codes)}
+        with open(users_file, 'rb') as f:
+            stored = json.load(f)
+        ids = {u['id'] for u in stored}
+        assert len(stored) == n and ids == {user_id for _, user_id in results}, (len(stored), n)
+        print(f'  ✓ {n} parallel registrations across 3 surfaces, all stored once')
+
+        races = 30
+        raced = [[pool.submit(register, n + j, url) for url in urls] for j in range(races)]
+        for attempt in raced:
+            codes = sorted(f.result()[0] for f in attempt)
+            assert codes == [201, 409, 409], codes
+        with open(users_file, 'rb') as f:
+            stored = json.load(f)
+        emails = [u['email'] for u in stored]
+        assert len(emails) == len(set(emails)) == n + races, (len(emails), len(set(emails)))
+        print(f'  ✓ {races} same-email races: exactly one registration each')
+
+        def decide(i):
+            user_id = results[i][1]
+            action = 'approve' if i % 2 == 0 else 'reject'
+            r = requests.post(f'{urls[(i + 1) % len(urls)]}/api/users/{user_id}/{action}', headers=ADMIN)
+            return r.status_code
+
+        codes = list(pool.map(decide, range(n)))
+        assert codes == [200] * n, {c: codes.count(c) for c in set(codes)}
+        with open(users_file, 'rb') as f:
+            by_id = {u['id']: u for u in json.load(f)}
+        for i, (_, user_id) in enumerate(results):
+            expected = 'approved' if i % 2 == 0 else 'rejected'
+            assert by_id[user_id]['status'] == expected, (i, by_id[user_id])
+            assert (expected == 'approved') == bool(by_id[user_id].get('access_token'))
+        print(f'  ✓ {n} parallel approvals/rejections through other servers all persisted')
+
+        # user4 was approved through the standalone Flask server
+        token = requests.post(f'{fastapi_url}/api/login', json={'email': 'user4@example.com'}).json()['token']
+        page = requests.get(f'{fastapi_url}/pages/python.html', headers={'X-User-Token': token},
+                            allow_redirects=False)
+        assert page.status_code == 200, page.status_code
+        print('  ✓ user approved through Flask can log in to FastAPI')
+        print('✓ no lost or duplicated writes')
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Purge-on-edit check against a caching reverse proxy.
+
+Usage:
+    python check_edge_cache.py [reads]   (default 50)
+
+Starts ``server_fastapi`` on a scratch data directory with
+``TA_CACHE_PURGE_URL`` pointing at a small in-process stand-in for Varnish,
+which speaks the same protocol as ``varnish.vcl``:
+
+- it caches 200 responses for their ``s-maxage``, tagged with their
+  ``Surrogate-Key``, and, like Varnish's default TTL, 404s for two minutes;
+- ``PURGE`` with a ``Surrogate-Key`` header drops every object carrying one
+  of the keys, and a plain ``PURGE /path`` drops that URL.
+
+The check then verifies that repeated anonymous reads of the index and of a
+concept reach Python once (counted from the app's ``/metrics``), and that
+updating, renaming and deleting the concept is visible through the proxy as
+soon as the purge lands, as is creating a concept at a URL whose 404 the
+proxy had cached.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PORT = 7470
+PROXY_PORT = 7471
+ADMIN = {'X-Admin-Token': 'admin123'}
+DEADLINE = 2.0  # seconds allowed for a purge to land
+S_MAXAGE = re.compile(r's-maxage=(\d+)')
+DEFAULT_TTL = 120  # varnishd default_ttl, applied to cacheable responses without s-maxage
+
+
+class StandInProxy(BaseHTTPRequestHandler):
+    """Minimal shared cache: GETs by URL, bans by surrogate key, purges by URL."""
+
+    backend = f'http://127.0.0.1:{APP_PORT}'
+    cache = {}  # url -> (expires, status, headers, body, keys)
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, headers, body, state):
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() not in ('surrogate-key', 'transfer-encoding', 'content-length', 'connection'):
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Cache', state)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.lock:
+            hit = self.cache.get(self.path)
+        if hit and hit[0] > time.monotonic():
+            return self.reply(hit[1], hit[2], hit[3], 'HIT')
+        request = urllib.request.Request(self.backend + self.path)  # cookies are not forwarded
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, headers, body = response.status, response.getheaders(), response.read()
+        except urllib.error.HTTPError as exc:
+            status, headers, body = exc.code, exc.headers.items(), exc.read()
+        header_map = {name.lower(): value for name, value in headers}
+        ttl = S_MAXAGE.search(header_map.get('cache-control', ''))
+        if (status == 200 and ttl) or status == 404:
+            ttl = int(ttl.group(1)) if ttl else DEFAULT_TTL
+            keys = set(header_map.get('surrogate-key', '').split())
+            with self.lock:
+                self.cache[self.path] = (time.monotonic() + ttl, status, headers, body, keys)
+        self.reply(status, headers, body, 'MISS')
+
+    def do_PURGE(self):
+        keys = set(self.headers.get('Surrogate-Key', '').split())
+        with self.lock:
+            if keys:
+                doomed = [url for url, entry in self.cache.items() if entry[4] & keys]
+            else:
+                doomed = [self.path] if self.path in self.cache else []
+            for url in doomed:
+                del self.cache[url]
+        self.reply(200 if doomed or keys else 404, [], b'', 'PURGE')
+
+
+def backend_hits(route):
+    text = requests.get(f'http://127.0.0.1:{APP_PORT}/metrics').text
+    pattern = re.compile(r'ta_http_requests_total\{[^}]*route="%s",method="GET",status="(\d+)"\} (\d+)' % re.escape(route))
+    return sum(int(count) for _status, count in pattern.findall(text))
+
+
+def wait_for(check, what):
+    start = time.monotonic()
+    while not check():
+        if time.monotonic() - start > DEADLINE:
+            raise SystemExit(f'  ✗ {what}')
+        time.sleep(0.02)
+    print(f'  ✓ {what} ({(time.monotonic() - start) * 1000:.0f} ms)')
+
+
+def main():
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    scratch = tempfile.mkdtemp(prefix='ta-edge-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    shutil.copy(os.path.join(BASE_DIR, 'data', 'concepts.json'), data_dir)
+    env = dict(os.environ, TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'),
+               TA_CACHE_PURGE_URL=f'http://127.0.0.1:{PROXY_PORT}')
+    env.pop('TA_BUS_DIR', None)
+    proxy = ThreadingHTTPServer(('127.0.0.1', PROXY_PORT), StandInProxy)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    app = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'server_fastapi:app', '--port', str(APP_PORT),
+                            '--log-level', 'warning'], cwd=BASE_DIR, env=env)
+    edge = f'http://127.0.0.1:{PROXY_PORT}'
+    try:
+        for _ in range(100):
+            try:
+                requests.get(f'http://127.0.0.1:{APP_PORT}/metrics', timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        with open(os.path.join(data_dir, 'concepts.json'), 'r', encoding='utf-8') as f:
+            concept = json.load(f)[0]
+        url = f"/concepts/{concept['slug']}"
+        print(f'✓ app on :{APP_PORT}, stand-in proxy on :{PROXY_PORT}')
+
+        first = requests.get(edge + url, cookies={'TA_USER_TOKEN': 'x'})
+        assert 'public' in first.headers['Cache-Control'] and 's-maxage' in first.headers['Cache-Control']
+        states = [requests.get(edge + path).headers['X-Cache'] for path in (url, '/') for _ in range(reads)]
+        assert states.count('MISS') == 1, states.count('MISS')  # '/' is the only new URL
+        assert backend_hits('/concepts/{slug}') == 1 and backend_hits('/') == 1
+        print(f'  ✓ {2 * reads + 1} anonymous reads of {url} and / reached Python twice')
+
+        marker = f'edited-{time.time()}'
+        r = requests.put(f'http://127.0.0.1:{APP_PORT}/api/concepts/{concept["id"]}', headers=ADMIN,
+                         json={'content': f'<h2>{marker}</h2><p>updated</p>'})
+        assert r.status_code == 200, r.status_code
+        wait_for(lambda: marker in requests.get(edge + url).text, 'update purged the concept page')
+        assert requests.get(edge + '/').headers['X-Cache'] == 'HIT'
+        print('  ✓ index stayed cached')
+
+        fresh = f'/concepts/new-{int(time.time())}'
+        assert [requests.get(edge + fresh).headers['X-Cache'] for _ in range(2)] == ['MISS', 'HIT']
+        r = requests.post(f'http://127.0.0.1:{APP_PORT}/api/concepts', headers=ADMIN,
+                          json={'title': 'New concept', 'slug': fresh.rsplit('/', 1)[1]})
+        assert r.status_code == 200, r.status_code
+        wait_for(lambda: requests.get(edge + fresh).status_code == 200, 'create purged the cached 404')
+
+        renamed = f"{concept['slug']}-renamed"
+        requests.put(f'http://127.0.0.1:{APP_PORT}/api/concepts/{concept["id"]}', headers=ADMIN,
+                     json={'slug': renamed})
+        wait_for(lambda: requests.get(edge + url).status_code == 404, 'old slug purged after rename')
+        assert marker in requests.get(f'{edge}/concepts/{renamed}').text
+
+        requests.delete(f'http://127.0.0.1:{APP_PORT}/api/concepts/{concept["id"]}', headers=ADMIN)
+        wait_for(lambda: requests.get(f'{edge}/concepts/{renamed}').status_code == 404,
+                 'delete purged the concept page')
+        purges = re.findall(r'ta_cache_purges_total\{[^}]*kind="(\w+)",status="(\w+)"\} (\d+)',
+                            requests.get(f'http://127.0.0.1:{APP_PORT}/metrics').text)
+        print(f'✓ purge-on-edit works ({", ".join(f"{k}/{s}: {n}" for k, s, n in purges)})')
+    finally:
+        app.terminate()
+        app.wait()
+        proxy.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
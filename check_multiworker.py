@@ -0,0 +1,126 @@
+"""Cache-coherence check for multi-worker mode.
+
+Usage:
+    python check_multiworker.py [worker count]   (default 4)
+
+Starts N copies of ``server_fastapi:app`` on consecutive ports. They share a
+scratch data directory, a static export and a bus directory, exactly as
+``uvicorn --workers N`` processes would, but each has its own port so the
+check can address every worker. State is changed through one worker and must
+be visible on all the others well inside the 5 second mtime fallback, which
+only the bus can deliver.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_PORT = 7400
+ADMIN = {'X-Admin-Token': 'admin123'}
+DEADLINE = 1.0  # seconds allowed for a change to reach every worker
+
+
+def wait_for(check, what):
+    start = time.monotonic()
+    while True:
+        failures = check()
+        if not failures:
+            print(f'  ✓ {what} ({(time.monotonic() - start) * 1000:.0f} ms)')
+            return
+        if time.monotonic() - start > DEADLINE:
+            raise SystemExit(f'  ✗ {what}: stale on workers {failures}')
+        time.sleep(0.02)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    scratch = tempfile.mkdtemp(prefix='ta-multiworker-')
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    shutil.copy(os.path.join(BASE_DIR, 'data', 'concepts.json'), data_dir)
+    env = dict(os.environ, TA_DATA_DIR=data_dir, TA_BUS_DIR=os.path.join(scratch, 'bus'),
+               TA_STATIC_DIR=os.path.join(scratch, 'static'), TA_SESSION_SECRET='multiworker-check',
+               TA_RATE_LOGIN='1000/1', TA_RATE_REGISTER='1000/1')
+    subprocess.run([sys.executable, 'static_site.py', 'build-static'], cwd=BASE_DIR, env=env, check=True)
+
+    urls = [f'http://127.0.0.1:{BASE_PORT + i}' for i in range(n)]
+    procs = [subprocess.Popen([sys.executable, '-m', 'uvicorn', 'server_fastapi:app',
+                               '--port', str(BASE_PORT + i), '--log-level', 'warning'],
+                              cwd=BASE_DIR, env=env) for i in range(n)]
+    try:
+        for url in urls:
+            for _ in range(100):
+                try:
+                    requests.get(f'{url}/metrics', timeout=1)
+                    break
+                except requests.ConnectionError:
+                    time.sleep(0.1)
+        # warm every worker's caches
+        for url in urls:
+            requests.get(f'{url}/api/users', headers=ADMIN)
+            requests.get(f'{url}/concepts/python-complete-guide')
+        print(f'✓ {n} workers up, sharing {scratch}')
+
+        email = 'coherence@example.com'
+        user_id = requests.post(f'{urls[0]}/api/register', json={'name': 'c', 'email': email}).json()['id']
+
+        def status_on_all(expected):
+            def check():
+                bad = []
+                for i, url in enumerate(urls):
+                    users = requests.get(f'{url}/api/users', headers=ADMIN).json()
+                    if not any(u['id'] == user_id and u['status'] == expected for u in users):
+                        bad.append(i)
+                return bad
+            return check
+
+        wait_for(status_on_all('pending'), 'registration on worker 0 visible everywhere')
+        dup = [requests.post(f'{url}/api/register', json={'name': 'c', 'email': email.upper()}).status_code
+               for url in urls]
+        assert dup == [409] * n, dup
+        print('  ✓ duplicate email rejected by every worker')
+
+        requests.post(f'{urls[1 % n]}/api/users/{user_id}/approve', headers=ADMIN)
+        wait_for(status_on_all('approved'), 'approval on worker 1 visible everywhere')
+
+        token = requests.post(f'{urls[2 % n]}/api/login', json={'email': email}).json()['token']
+
+        def page_status(expected):
+            def check():
+                return [i for i, url in enumerate(urls)
+                        if requests.get(f'{url}/pages/python.html', headers={'X-User-Token': token},
+                                        allow_redirects=False).status_code != expected]
+            return check
+
+        wait_for(page_status(200), 'session from worker 2 accepted everywhere')
+        requests.post(f'{urls[3 % n]}/api/users/{user_id}/reject', headers=ADMIN)
+        wait_for(page_status(307), 'rejection on worker 3 revokes the session everywhere')
+
+        concept = next(c for c in requests.get(f'{urls[0]}/api/concepts', headers=ADMIN).json()
+                       if c['slug'] == 'python-complete-guide')
+        marker = f'coherence-{time.time()}'
+        requests.put(f"{urls[0]}/api/concepts/{concept['id']}", headers=ADMIN,
+                     json={'content': f'<p>{marker}</p>'})
+        wait_for(lambda: [i for i, url in enumerate(urls)
+                          if marker not in requests.get(f'{url}/concepts/python-complete-guide').text],
+                 'concept edit on worker 0 served everywhere')
+        requests.delete(f"{urls[0]}/api/concepts/{concept['id']}", headers=ADMIN)
+        wait_for(lambda: [i for i, url in enumerate(urls)
+                          if requests.get(f'{url}/concepts/python-complete-guide').status_code != 404],
+                 'concept delete on worker 0 served everywhere')
+        print('✓ all workers coherent')
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Byte ranges and conditional requests on tutorial pages.
+
+Usage:
+    python check_ranges.py
+
+Runs ``page_files.PageFileResponse`` in-process against a scratch page,
+once held in memory and once read from disk (chunked and zero-copy), and
+checks that:
+
+- a plain range, a suffix (``bytes=-N``) and an open-ended (``bytes=N-``)
+  range give 206 with the right Content-Range and bytes, ends past the file
+  are clamped and a suffix longer than the file is the whole file;
+- ranges starting at or past the end, and ``bytes=-0``, give 416 with
+  ``Content-Range: bytes */size``;
+- multiple ranges, reversed or malformed ranges and other units are ignored
+  (200 with the full body), as is a range under a stale ``If-Range``;
+- ``If-None-Match`` with the current ETag gives 304 and HEAD sends no body.
+"""
+import asyncio
+import os
+import sys
+
+import page_files
+from checkutil import expect, scratch_data
+
+
+async def fetch(page, headers=(), method='GET', extensions=None):
+    """Serve ``page``; returns (status, headers dict, body bytes)."""
+    scope = {'type': 'http', 'method': method, 'headers': [(k.encode(), v.encode()) for k, v in headers],
+             'extensions': extensions or {}}
+    start = {}
+    body = bytearray()
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            start.update(message)
+        elif message['type'] == 'http.response.body':
+            body.extend(message.get('body', b''))
+        elif message['type'] == 'http.response.zerocopysend':
+            message['file'].seek(message['offset'])
+            body.extend(message['file'].read(message['count']))
+
+    await page_files.PageFileResponse(page)(scope, receive, send)
+    response_headers = {k.decode(): v.decode() for k, v in start['headers']}
+    return start['status'], response_headers, bytes(body)
+
+
+async def check_page(page, data, extensions=None):
+    size = len(data)
+
+    async def get(*headers, method='GET'):
+        return await fetch(page, headers, method=method, extensions=extensions)
+
+    async def partial(value, first, last, what):
+        status, headers, body = await get(('range', value))
+        expect(status == 206 and headers['content-range'] == f'bytes {first}-{last}/{size}'
+               and headers['content-length'] == str(last - first + 1) and body == data[first:last + 1], what)
+
+    async def full(what, *headers):
+        status, response_headers, body = await get(*headers)
+        expect(status == 200 and 'content-range' not in response_headers and body == data, what)
+
+    async def unsatisfiable(value, what):
+        status, headers, body = await get(('range', value))
+        expect(status == 416 and headers['content-range'] == f'bytes */{size}' and body == b'', what)
+
+    await full('no Range gives the whole page')
+    await partial('bytes=0-99', 0, 99, 'bytes=0-99 gives the first 100 bytes')
+    await partial('bytes=100-100', 100, 100, 'a one-byte range')
+    await partial('bytes=-100', size - 100, size - 1, 'suffix bytes=-100 gives the last 100 bytes')
+    await partial(f'bytes=-{size * 2}', 0, size - 1, 'a suffix longer than the page gives all of it')
+    await partial('bytes=9000-', 9000, size - 1, 'open-ended bytes=9000- runs to the end')
+    await partial(f'bytes={size - 1}-', size - 1, size - 1, 'open-ended from the last byte')
+    await partial(f'bytes=100-{size * 2}', 100, size - 1, 'an end past the page is clamped')
+    await partial(' bytes = 5 - 9 ', 5, 9, 'whitespace around the spec is tolerated')
+    await unsatisfiable(f'bytes={size}-', 'a range starting at the end is 416')
+    await unsatisfiable(f'bytes={size + 10}-{size + 20}', 'a range past the end is 416')
+    await unsatisfiable('bytes=-0', 'an empty suffix is 416')
+    await full('multiple ranges are ignored', ('range', 'bytes=0-9,20-29'))
+    await full('a reversed range is ignored', ('range', 'bytes=10-5'))
+    await full('a malformed range is ignored', ('range', 'bytes=abc'))
+    await full('other units are ignored', ('range', 'items=0-5'))
+    status, headers, body = await get(('range', 'bytes=0-9'), ('if-range', page.etag))
+    expect(status == 206 and body == data[:10], 'If-Range with the current ETag honours the range')
+    await full('a stale If-Range sends the whole page', ('range', 'bytes=0-9'), ('if-range', '"stale"'))
+    status, headers, body = await get(('if-none-match', page.etag))
+    expect(status == 304 and body == b'' and headers['etag'] == page.etag, 'If-None-Match with the ETag gives 304')
+    await full('a different ETag gives 200', ('if-none-match', '"other"'))
+    status, headers, body = await get(('range', 'bytes=0-9'), method='HEAD')
+    expect(status == 206 and headers['content-length'] == '10' and body == b'', 'HEAD with a range sends no body')
+
+
+def main():
+    data = bytes(range(256)) * 40
+    with scratch_data('ta-ranges-') as scratch:
+        with open(os.path.join(scratch, 'page.txt'), 'wb') as f:
+            f.write(data)
+        cached = page_files.load_page(scratch, 'page.txt', cache_limit=len(data))
+        on_disk = page_files.load_page(scratch, 'page.txt', cache_limit=0)
+        assert cached.body is not None and on_disk.body is None
+        print('held in memory')
+        asyncio.run(check_page(cached, data))
+        print('read from disk')
+        asyncio.run(check_page(on_disk, data))
+        print('zero-copy send')
+        asyncio.run(check_page(on_disk, data, extensions={'http.response.zerocopysend': {}}))
+    print('✓ ranges and conditional requests behave')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
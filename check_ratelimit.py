@@ -0,0 +1,154 @@
+"""Token-bucket rate limiting of the login and register endpoints.
+
+Usage:
+    python check_ratelimit.py
+
+Runs in-process and checks that:
+
+- rates parse, and invalid ones are refused;
+- a bucket allows its capacity in a burst, then refills at its rate with an
+  accurate Retry-After, and never above capacity;
+- a full probe window recycles the longest-idle slot;
+- with ``TA_RATE_SHM`` two processes draw from the same buckets;
+- the middleware limits per IP and per email, keys on ``X-Forwarded-For``
+  only from a trusted proxy, and applies the register limit to the Flask
+  API mounted at ``/legacy``.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import uuid
+
+import ratelimit
+from checkutil import expect, scratch_data
+
+
+def take_in_child(shm_name, queue):
+    table = ratelimit.TokenBucketTable(slots=64, shm_name=shm_name)
+    queue.put([table.take('shared', 4, 0.001, now=1000.0)[0] for _ in range(3)])
+
+
+async def post(app, path, body, client='10.0.0.1', forwarded=None):
+    headers = [(b'content-type', b'application/json')]
+    if forwarded:
+        headers.append((b'x-forwarded-for', forwarded.encode()))
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': headers, 'client': (client, 1), 'server': ('127.0.0.1', 80), 'root_path': ''}
+    status = None
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {'type': 'http.disconnect'}
+        sent = True
+        return {'type': 'http.request', 'body': json.dumps(body).encode(), 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def ok_app(scope, receive, send):
+    await receive()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def main():
+    print('rates')
+    expect(ratelimit.parse_rate('5/60') == (5.0, 5 / 60), '"5/60" is 5 tokens refilled over a minute')
+    for bad in ('0/60', '5/0', '-1/1', 'x/1'):
+        try:
+            ratelimit.parse_rate(bad)
+        except ValueError:
+            continue
+        raise SystemExit(f'  ✗ {bad!r} accepted')
+    print('  ✓ zero, negative and non-numeric rates are refused')
+
+    print('buckets')
+    table = ratelimit.TokenBucketTable(slots=64)
+    burst = [table.take('k', 3, 1.0, now=100.0) for _ in range(4)]
+    expect([allowed for allowed, _ in burst] == [True, True, True, False], 'a burst gets exactly the capacity')
+    expect(abs(burst[-1][1] - 1.0) < 1e-9, 'the refused request is told to retry in 1 s')
+    expect(not table.take('k', 3, 1.0, now=100.5)[0], 'half a token is not enough')
+    expect(table.take('k', 3, 1.0, now=101.6)[0], 'a token is back after its refill time')
+    results = [table.take('k', 3, 1.0, now=1000.0)[0] for _ in range(4)]
+    expect(results == [True, True, True, False], 'a long idle period refills to capacity, not beyond')
+    expect(table.take('other', 3, 1.0, now=100.0)[0], 'keys have separate buckets')
+
+    tiny = ratelimit.TokenBucketTable(slots=ratelimit.PROBE)
+    for i in range(ratelimit.PROBE):
+        tiny.take(f'key-{i}', 1, 0.001, now=10.0 + i)
+    expect(tiny.take('newcomer', 1, 0.001, now=50.0)[0], 'a full table admits a new key')
+    expect(tiny.take('key-0', 1, 0.001, now=51.0)[0], 'by recycling the longest-idle slot')
+    expect(not tiny.take(f'key-{ratelimit.PROBE - 1}', 1, 0.001, now=52.0)[0], 'recently used slots are kept')
+
+    print('shared memory')
+    shm_name = f'ta-rate-check-{uuid.uuid4().hex[:8]}'
+    shared = ratelimit.TokenBucketTable(slots=64, shm_name=shm_name)
+    try:
+        expect(shared.take('shared', 4, 0.001, now=1000.0)[0], 'the parent takes the first token')
+        queue = multiprocessing.get_context('spawn').Queue()
+        child = multiprocessing.get_context('spawn').Process(target=take_in_child, args=(shm_name, queue))
+        child.start()
+        child_results = queue.get(timeout=30)
+        child.join()
+        expect(child_results == [True, True, True], 'a second process takes the remaining three')
+        expect(not shared.take('shared', 4, 0.001, now=1000.0)[0], 'and the parent then finds the bucket empty')
+    finally:
+        # the table unregistered the segment from the resource tracker; hand it back to unlink it
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shared._shm._name, 'shared_memory')
+        shared._shm.close()
+        shared._shm.unlink()
+        os.remove(os.path.join(tempfile.gettempdir(), f'{shm_name}.lock'))
+
+    print('middleware')
+    rules = {'/api/login': (2, 0.001), '/api/register': (2, 0.001)}
+
+    async def middleware_checks():
+        app = ratelimit.RateLimitMiddleware(ok_app, rules=rules, table=ratelimit.TokenBucketTable(),
+                                            trusted=['127.0.0.1'])
+        statuses = [await post(app, '/api/login', {'email': f'u{i}@example.com'}) for i in range(3)]
+        expect(statuses == [200, 200, 429], 'one IP is limited across emails')
+        statuses = [await post(app, '/api/login', {'email': ' Same@Example.com'}, client=f'10.1.0.{i}')
+                    for i in range(3)]
+        expect(statuses == [200, 200, 429], 'one email is limited across IPs, case-insensitively')
+        statuses = [await post(app, '/api/login', {}, client='127.0.0.1', forwarded=f'203.0.113.{i}')
+                    for i in range(4)]
+        expect(statuses == [200] * 4, 'behind a trusted proxy each forwarded client has its own bucket')
+        statuses = [await post(app, '/api/login', {}, client='127.0.0.1', forwarded='198.51.100.7, 127.0.0.1')
+                    for i in range(3)]
+        expect(statuses == [200, 200, 429], 'the right-most untrusted hop is the client')
+        statuses = [await post(app, '/api/login', {}, client='10.2.0.1', forwarded=f'203.0.113.{50 + i}')
+                    for i in range(3)]
+        expect(statuses == [200, 200, 429], 'X-Forwarded-For from an untrusted peer is ignored')
+        statuses = [await post(app, path, {}, client='10.3.0.1')
+                    for path in ('/api/register', '/legacy/api/register', '/legacy/api/register')]
+        expect(statuses == [200, 200, 429], '/legacy/api/register shares the /api/register buckets')
+
+    asyncio.run(middleware_checks())
+
+    os.environ.pop('TA_RATE_SHM', None)
+    with scratch_data('ta-rate-', TA_LEGACY_FLASK='1', TA_RATE_REGISTER='3/3600'):
+        from fastapi.testclient import TestClient
+        import server_fastapi
+
+        with TestClient(server_fastapi.app) as client:
+            statuses = [client.post('/legacy/api/register', json={'name': 'L', 'email': f'l{i}@example.com'})
+                        .status_code for i in range(4)]
+        expect(statuses[:3] == [201] * 3 and statuses[3] == 429, 'the mounted Flask register endpoint is limited')
+    print('✓ rate limits hold')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
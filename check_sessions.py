@@ -0,0 +1,98 @@
+"""Signed session tokens: signing, verification and revocation.
+
+Usage:
+    python check_sessions.py
+
+Runs in-process on a scratch data directory with a fixed
+``TA_SESSION_SECRET`` and checks that:
+
+- a freshly issued token verifies, and one signed with another secret,
+  tampered with, truncated, expired or issued to a non-approved user does not;
+- logging out revokes that token only, and rejecting a user revokes every
+  token issued before the rejection but not ones issued afterwards;
+- a second revocation list on the same file (another worker) sees both;
+- through the app, ``/api/me`` and protected pages follow the same rules,
+  including the cached token check in ``auth.authorized_user_id``.
+"""
+import sys
+import time
+
+from checkutil import expect, scratch_data
+
+
+def tamper(token, part):
+    pieces = token.split('.')
+    text = pieces[part]
+    pieces[part] = text[:-2] + ('A' if text[-2] != 'A' else 'B') + text[-1]
+    return '.'.join(pieces)
+
+
+def main():
+    with scratch_data('ta-sessions-', TA_SESSION_SECRET='check-secret'):
+        import sessions
+
+        user = {'id': 'u1', 'name': 'Ada', 'status': 'approved'}
+        token = sessions.issue_session(user)
+        print('signing')
+        expect(sessions.verify_session(token)['uid'] == 'u1', 'issued token verifies')
+        expect(sessions.verify_session(tamper(token, 1)) is None, 'tampered payload is rejected')
+        expect(sessions.verify_session(tamper(token, 2)) is None, 'tampered signature is rejected')
+        expect(sessions.verify_session(token.rsplit('.', 1)[0]) is None, 'token without signature is rejected')
+        expect(sessions.verify_session('v2' + token[2:]) is None, 'unknown version is rejected')
+        expect(sessions.verify_session('not-a-token') is None, 'garbage is rejected')
+        sessions.SECRET = b'another-secret'
+        expect(sessions.verify_session(token) is None, 'token signed with another secret is rejected')
+        sessions.SECRET = None
+        expect(sessions.verify_session(sessions.issue_session(user, ttl=-1)) is None, 'expired token is rejected')
+        expect(sessions.verify_session(sessions.issue_session(dict(user, status='pending'))) is None,
+               'token of a non-approved user is rejected')
+
+        print('revocation')
+        other = sessions.issue_session(user)
+        expect(sessions.REVOCATIONS.revoke_token(token), 'logout revokes a valid token')
+        expect(sessions.verify_session(token) is None, 'logged-out token is rejected')
+        expect(sessions.verify_session(other) is not None, "the user's other token still verifies")
+        expect(not sessions.REVOCATIONS.revoke_token('v1.bogus.sig'), 'unsigned tokens are not recorded')
+        sessions.REVOCATIONS.revoke_user('u1')
+        expect(sessions.verify_session(other) is None, 'rejecting the user revokes earlier tokens')
+        time.sleep(0.002)
+        later = sessions.issue_session(user)
+        expect(sessions.verify_session(later) is not None, 'tokens issued after the rejection verify')
+        peer = sessions.RevocationList()
+        expect(peer.is_revoked(sessions.decode_session(token)) and peer.is_revoked(sessions.decode_session(other))
+               and not peer.is_revoked(sessions.decode_session(later)),
+               'another worker reading the file sees the same revocations')
+
+        print('through the app')
+        from fastapi.testclient import TestClient
+        import server_fastapi
+        from core import users
+
+        admin = {'X-Admin-Token': 'admin123'}
+        with TestClient(server_fastapi.app) as client:
+            user_id = users.register('Grace', 'grace@example.com')
+            users.approve(user_id)
+            first = client.post('/api/login', json={'email': 'grace@example.com'}).json()['token']
+            second = client.post('/api/login', json={'email': 'grace@example.com'}).json()['token']
+            client.cookies.clear()  # each request below names its token explicitly
+
+            def me(tok):
+                return client.get('/api/me', headers={'X-User-Token': tok}).status_code
+
+            def page(tok):
+                return client.get('/pages/python.html', cookies={'TA_USER_TOKEN': tok},
+                                  follow_redirects=False).status_code
+
+            expect(me(first) == 200 and page(first) == 200, 'logged-in token opens /api/me and a protected page')
+            client.post('/api/logout', headers={'X-User-Token': first})
+            expect(me(first) == 401 and page(first) == 307, 'logout closes both, despite the cached check')
+            expect(me(second) == 200 and page(second) == 200, 'a second session stays open')
+            assert client.post(f'/api/users/{user_id}/reject', headers=admin).status_code == 200
+            expect(me(second) == 401 and page(second) == 307, 'rejection closes every session')
+            expect(client.post('/api/login', json={'email': 'grace@example.com'}).status_code == 403,
+                   'a rejected user cannot log in again')
+    print('✓ session tokens sign, verify and revoke as expected')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""Shared helpers for the in-process ``check_*.py`` scripts."""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+def expect(ok, what):
+    """Print a ✓ line for ``what``, or exit with a ✗ line if it does not hold."""
+    if not ok:
+        raise SystemExit(f'  ✗ {what}')
+    print(f'  ✓ {what}')
+
+
+@contextmanager
+def scratch_data(prefix, **env):
+    """Point the app at a fresh scratch directory for the duration; yields its path.
+
+    ``TA_DATA_DIR`` is ``<scratch>/data`` (created) and ``TA_STATIC_DIR``
+    ``<scratch>/static``; the access log is off, the bus is disabled and
+    ``env`` is added on top. Set it up before importing the app, whose modules
+    read these variables at import time.
+    """
+    scratch = tempfile.mkdtemp(prefix=prefix)
+    data_dir = os.path.join(scratch, 'data')
+    os.makedirs(data_dir)
+    os.environ.update(TA_DATA_DIR=data_dir, TA_STATIC_DIR=os.path.join(scratch, 'static'), TA_ACCESS_LOG='', **env)
+    os.environ.pop('TA_BUS_DIR', None)
+    try:
+        yield scratch
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,135 @@
+"""In-memory concept catalog backed by ``data/concepts.json``.
+
+Keeps the parsed concept list resident with indexes by id and slug, so
+``/concepts/{slug}`` is a dict lookup instead of a file parse and linear scan.
+Like ``user_store.UserStore`` the file is re-read only when its mtime or size
+changes (at most every ``revalidate_after`` seconds when the bus announces
+edits), and writers go through ``transaction()``, which holds the
+cross-process file lock around reload, edit and save.
+
+The file is created and parsed on first access; a preloading master (see
+``preload.py``) does that once so every forked worker shares the pages.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import jsonio
+import metrics
+import sections
+
+
+class ConceptCatalog:
+    def __init__(self, path, revalidate_after=0.0):
+        self.path = path
+        self.revalidate_after = revalidate_after
+        self._checked = 0.0
+        self._concepts = []
+        self._by_id = {}
+        self._by_slug = {}
+        self._raw = b'[]'
+        self._signature = None
+        self._sections = {}  # concept id -> <h2> split points, kept out of the records
+
+    def ensure_file(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not os.path.exists(self.path):
+            jsonio.write_file(self.path, [])
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.ensure_file()  # created on first use rather than at import
+            st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def invalidate(self):
+        self._checked = 0.0
+
+    def _refresh(self, force=False):
+        if self.revalidate_after and not force:
+            now = time.monotonic()
+            if now - self._checked < self.revalidate_after:
+                return
+            self._checked = now
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        with metrics.timer('load_concepts'):
+            self._concepts, self._raw = jsonio.read_file(self.path)
+        self._signature = signature
+        self._strip_sections()
+        self._reindex()
+
+    def _strip_sections(self):
+        # earlier versions stored split points in the records; move them to the index
+        stored = {c['id']: c.pop('sections') for c in self._concepts if 'sections' in c}
+        if stored:
+            self._sections.update(stored)
+            self._raw = jsonio.dumps(self._concepts)
+
+    def _reindex(self):
+        self._by_id = {c['id']: c for c in self._concepts}
+        self._by_slug = {c.get('slug'): c for c in self._concepts}
+
+    def all(self):
+        self._refresh()
+        return self._concepts
+
+    def raw(self):
+        """JSON bytes of the whole catalog, as stored on disk."""
+        self._refresh()
+        return self._raw
+
+    def get(self, concept_id):
+        self._refresh()
+        return self._by_id.get(concept_id)
+
+    def by_slug(self, slug):
+        self._refresh()
+        return self._by_slug.get(slug)
+
+    @property
+    def version(self):
+        """File signature of the loaded catalog; changes with every save or reload."""
+        return self._signature
+
+    def section_points(self, concept):
+        """``<h2>`` split points of a concept (see ``sections.py``).
+
+        Computed by ``save()``, or on first use after a reload, and recomputed
+        if stale because the file was edited outside the app.
+        """
+        content = concept.get('content') or ''
+        points = self._sections.get(concept['id'])
+        if points is None or not sections.is_current(content, points):
+            points = self._sections[concept['id']] = sections.split_points(content)
+        return points
+
+    @contextmanager
+    def transaction(self):
+        """Lock the file and reload it if changed for a read-modify-write cycle.
+
+        Unlike ``UserStore.transaction`` nothing is saved implicitly: callers
+        ``save()`` and then refresh the static export while still holding the
+        lock.
+        """
+        with jsonio.locked(self.path):
+            self._refresh(force=True)
+            yield self
+
+    def save(self, concepts=None):
+        """Persist ``concepts`` (or the live list after in-place edits) and rebuild indexes.
+
+        Section split points are recomputed here, so reads never have to.
+        """
+        if concepts is not None:
+            self._concepts = concepts
+        self._sections = {c['id']: sections.split_points(c.get('content') or '') for c in self._concepts}
+        for concept in self._concepts:
+            concept.pop('sections', None)
+        with metrics.timer('save_concepts'):
+            self._raw = jsonio.write_file(self.path, self._concepts)
+        self._signature = self._stat()
+        self._reindex()
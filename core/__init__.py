@@ -0,0 +1,7 @@
+"""Storage, auth and user operations shared by both server entry points.
+
+``server_fastapi.py`` and the Flask ``server.py`` import these modules instead
+of reading and writing the data files themselves, so they apply the same
+rules (duplicate emails, approval tokens, session revocation) and serialize
+their writes through the same file locks.
+"""
@@ -0,0 +1,67 @@
+"""Admin and learner credentials.
+
+Learners present either a signed session token from ``users.login`` or the
+legacy per-user access token shown on the admin page.
+"""
+import os
+import time
+
+import sessions
+from core.storage import USERS
+
+ADMIN_TOKEN = os.environ.get('TA_ADMIN_TOKEN', 'admin123')  # change via environment
+# Session tokens that verified, as token -> (revocation generation, expiry, user id). Only
+# valid tokens are remembered, so junk cannot grow it; it is simply cleared when full.
+VERIFIED_LIMIT = 10000
+_verified = {}
+
+
+def is_admin(token):
+    return token == ADMIN_TOKEN
+
+
+def user_for_token(token):
+    """Return the approved user for a token, else None.
+
+    Signed session tokens are verified without touching the user store and
+    yield a minimal {id, name, status} dict. Legacy access tokens fall back to
+    the user store's token index.
+    """
+    if not token:
+        return None
+    if sessions.is_session_token(token):
+        claims = sessions.verify_session(token)
+        if claims is None:
+            return None
+        return {'id': claims['uid'], 'name': claims.get('name'), 'status': claims['st']}
+    u = USERS.find_by_token(token)
+    if u and u.get('status') == 'approved':
+        return u
+    return None
+
+
+def authorized_user_id(token):
+    """Cheap authorization check: the id of the approved user owning ``token``, else None.
+
+    A session token that verified before is accepted with a dict lookup
+    until it expires or the revocation list changes; nothing else about the
+    user is loaded.
+    """
+    if not token:
+        return None
+    if not sessions.is_session_token(token):
+        user = user_for_token(token)
+        return user['id'] if user else None
+    revocations = sessions.REVOCATIONS
+    revocations.refresh()
+    cached = _verified.get(token)
+    if cached is not None and cached[0] == revocations.generation and cached[1] > time.time():
+        return cached[2]
+    claims = sessions.verify_session(token)
+    if claims is None:
+        _verified.pop(token, None)
+        return None
+    if len(_verified) >= VERIFIED_LIMIT:
+        _verified.clear()
+    _verified[token] = (revocations.generation, claims['exp'], claims['uid'])
+    return claims['uid']
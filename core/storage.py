@@ -0,0 +1,45 @@
+"""Data file locations and the process-wide stores built on them.
+
+Every store is cheap to construct and reads its file on first use. When both
+apps run in one process (Flask mounted under FastAPI) they share these
+objects; separate processes share the files, guarded by ``jsonio.locked``.
+"""
+import os
+
+import concept_catalog
+import progress_store
+import user_store
+from bus import BUS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('TA_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+USERS_FILE = os.path.join(DATA_DIR, 'users.json')
+CONCEPTS_FILE = os.path.join(DATA_DIR, 'concepts.json')
+
+# With the bus enabled, other workers announce changes, so file mtimes are only
+# re-checked every few seconds as a fallback.
+REVALIDATE_AFTER = 5.0 if BUS.enabled else 0.0
+
+USERS = user_store.UserStore(USERS_FILE, revalidate_after=REVALIDATE_AFTER)
+
+# Concept catalog parsed once and indexed by id and slug
+CONCEPTS = concept_catalog.ConceptCatalog(CONCEPTS_FILE, revalidate_after=REVALIDATE_AFTER)
+
+# Per-course progress lives in a memory-mapped users x courses byte matrix, opened by
+# get_progress() when progress is first used.
+PROGRESS = None
+
+
+def get_progress():
+    global PROGRESS
+    if PROGRESS is None:
+        store = progress_store.ProgressStore(os.path.join(DATA_DIR, 'progress.bin'),
+                                             os.path.join(DATA_DIR, 'progress_index.json'),
+                                             os.path.join(DATA_DIR, 'progress_users.txt'))
+        if store.created and store.import_users(USERS.all()):
+            # one-time migration: progress used to be nested in each users.json record
+            with USERS.transaction():
+                for u in USERS.all():
+                    u.pop('progress')
+        PROGRESS = store
+    return PROGRESS
@@ -0,0 +1,91 @@
+"""User lifecycle: registration, approval, rejection, login and logout.
+
+Each operation runs its read-modify-write inside ``USERS.transaction()`` and
+announces the change on the bus, whichever server called it. Failures are
+raised as the exceptions below for the caller to map onto its HTTP errors.
+"""
+from datetime import datetime
+from uuid import uuid4
+
+import sessions
+from bus import BUS
+from core.storage import USERS
+
+
+class UserNotFound(LookupError):
+    """Raised when no user matches the given id or email."""
+
+
+class NotApproved(PermissionError):
+    """Raised when a user who is not approved tries to log in."""
+
+
+def _now():
+    return datetime.utcnow().isoformat() + 'Z'
+
+
+def register(name, email, course='general'):
+    """Create a pending user and return its id; raises DuplicateEmail or ValueError."""
+    if not name or not email:
+        raise ValueError('name and email are required')
+    user_id = str(uuid4())
+    USERS.add({
+        'id': user_id,
+        'name': name,
+        'email': email.strip(),
+        'course': course,
+        'status': 'pending',
+        'registered_at': _now(),
+    })
+    BUS.publish('users')
+    return user_id
+
+
+def approve(user_id):
+    with USERS.transaction():
+        u = USERS.get(user_id)
+        if not u:
+            raise UserNotFound(user_id)
+        u['status'] = 'approved'
+        u['approved_at'] = _now()
+        # generate an access token for approved user so they can login
+        u['access_token'] = str(uuid4())
+    BUS.publish('users')
+
+
+def reject(user_id):
+    with USERS.transaction():
+        u = USERS.get(user_id)
+        if not u:
+            raise UserNotFound(user_id)
+        u['status'] = 'rejected'
+        u['rejected_at'] = _now()
+    # invalidate any signed sessions already handed out
+    sessions.REVOCATIONS.revoke_user(user_id)
+    BUS.publish('users')
+    BUS.publish('sessions')
+
+
+def login(email):
+    """Return (signed session token, user) for an approved user's email."""
+    if not email:
+        raise ValueError('email required')
+    u = USERS.find_by_email(email)
+    if not u:
+        raise UserNotFound(email)
+    if u.get('status') != 'approved':
+        raise NotApproved(email)
+    if not u.get('access_token'):
+        # ensure the legacy token exists for the admin copy-token flow
+        with USERS.transaction():
+            u = USERS.get(u['id'])
+            u['access_token'] = u.get('access_token') or str(uuid4())
+        BUS.publish('users')
+    return sessions.issue_session(u), u
+
+
+def logout(token):
+    """Revoke a signed session token; other tokens have nothing to revoke."""
+    if token and sessions.is_session_token(token):
+        sessions.REVOCATIONS.revoke_token(token)
+        BUS.publish('sessions')
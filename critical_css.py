@@ -0,0 +1,176 @@
+"""Critical-CSS extraction and render-unblocking rewrites for HTML pages.
+
+The first paint of a page only needs the rules for what is visible before
+scrolling. ``fold_tokens()`` collects the tag names, classes and ids used in
+the first ``FOLD_BYTES`` of a page's body, and ``extract()`` keeps the
+rules whose selectors could match them (``@media`` blocks are filtered the
+same way). The static build computes one such subset per page type and
+``optimize_page()`` then:
+
+- inlines the subset in a ``<style>`` block where the first stylesheet was;
+- turns each stylesheet ``<link>`` into ``rel=preload`` that switches itself
+  to a stylesheet on load, with a ``<noscript>`` fallback;
+- marks external scripts ``defer`` and wraps inline scripts that come after
+  one in a ``DOMContentLoaded`` listener, so they still run after the code
+  they use.
+
+Matching is deliberately generous (pseudo-classes and attribute selectors
+are ignored), so the subset errs towards including a rule.
+"""
+import re
+
+import page_files
+
+# Body markup considered above the fold; about one screen of a tutorial page
+FOLD_BYTES = 4096
+PAGE_TYPES = ('home', 'guide', 'auth', 'concept')
+
+HTML_COMMENT = re.compile(r'<!--.*?-->', re.S)
+START_TAG = re.compile(r'<([a-zA-Z][\w-]*)([^>]*)>')
+CLASS_ATTR = re.compile(r'''\bclass\s*=\s*(["'])(.*?)\1''', re.S)
+ID_ATTR = re.compile(r'''\bid\s*=\s*(["'])(.*?)\1''', re.S)
+PSEUDO_OR_ATTRIBUTE = re.compile(r'::?[\w-]+(?:\([^)]*\))?|\[[^\]]*\]')
+SIMPLE_SELECTOR = re.compile(r'([.#]?)(-?[_a-zA-Z][\w-]*)')
+STYLESHEET_LINK = re.compile(r'''<link\s+rel=(["'])stylesheet\1\s+href=(["'])([^"']+)\2\s*/?>''')
+SCRIPT = re.compile(r'<script\b([^>]*)>(.*?)</script>', re.S)
+
+
+def page_type(rel_path):
+    """Classify a site HTML file (path relative to the repo root)."""
+    name = rel_path.rsplit('/', 1)[-1]
+    if rel_path == 'index.html':
+        return 'home'
+    if name in page_files.PUBLIC_PAGES:
+        return 'auth'
+    return 'guide'
+
+
+def fold_tokens(html, fold_bytes=FOLD_BYTES):
+    """Tags (``div``), classes (``.logo``) and ids (``#intro``) used above the fold."""
+    start = html.find('<body')
+    markup = HTML_COMMENT.sub('', html[start if start >= 0 else 0:])[:fold_bytes]
+    tokens = {'html', 'body'}
+    for tag, attrs in START_TAG.findall(markup):
+        tokens.add(tag.lower())
+        for _q, classes in CLASS_ATTR.findall(attrs):
+            tokens.update('.' + c for c in classes.split())
+        for _q, value in ID_ATTR.findall(attrs):
+            tokens.add('#' + value.strip())
+    return tokens
+
+
+def _blocks(css):
+    """Split CSS into top-level (prelude, body) pairs."""
+    blocks = []
+    depth = 0
+    start = body_start = 0
+    prelude = ''
+    for i, ch in enumerate(css):
+        if ch == '{':
+            if depth == 0:
+                prelude = css[start:i].strip()
+                body_start = i + 1
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[body_start:i]))
+                start = i + 1
+    return blocks
+
+
+def _split_selectors(prelude):
+    parts = []
+    depth = 0
+    start = 0
+    for i, ch in enumerate(prelude):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(prelude[start:i])
+            start = i + 1
+    parts.append(prelude[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def may_match(selector, tokens):
+    """True unless the selector names a tag, class or id missing from ``tokens``."""
+    for prefix, name in SIMPLE_SELECTOR.findall(PSEUDO_OR_ATTRIBUTE.sub(' ', selector)):
+        if (prefix + name if prefix else name.lower()) not in tokens:
+            return False
+    return True
+
+
+def extract(css, tokens):
+    """Return the rules of ``css`` that may apply to an element in ``tokens``."""
+    out = []
+    for prelude, body in _blocks(css):
+        if prelude.startswith('@media'):
+            inner = extract(body, tokens)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@font-face'):
+            out.append(f'{prelude}{{{body}}}')
+        elif prelude.startswith('@'):
+            continue  # keyframes etc. can wait for the full stylesheet
+        else:
+            selectors = [s for s in _split_selectors(prelude) if may_match(s, tokens)]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+    return ''.join(out)
+
+
+def stylesheet_hrefs(html):
+    return [m.group(3) for m in STYLESHEET_LINK.finditer(html)]
+
+
+def async_stylesheet(href):
+    """Markup loading a stylesheet without blocking render."""
+    return (f'<link rel="preload" href="{href}" as="style" '
+            f'onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+
+def stylesheet_tags(hrefs, critical):
+    """Head markup for ``hrefs``: blocking links without ``critical`` CSS, else inlined + async."""
+    if not critical:
+        return ''.join(f'<link rel="stylesheet" href="{href}">' for href in hrefs)
+    return f'<style>{critical}</style>' + ''.join(async_stylesheet(href) for href in hrefs)
+
+
+def defer_scripts(html):
+    """Add ``defer`` to external scripts; delay inline scripts that follow one."""
+    deferred = False
+
+    def rewrite(m):
+        nonlocal deferred
+        attrs, code = m.group(1), m.group(2)
+        if 'src=' in attrs:
+            deferred = True
+            if re.search(r'\b(defer|async)\b', attrs):
+                return m.group(0)
+            return f'<script defer{attrs}>{code}</script>'
+        if deferred and 'type=' not in attrs:
+            # deferred scripts run right before DOMContentLoaded, so this still runs after them
+            return (f"<script{attrs}>document.addEventListener('DOMContentLoaded', function () {{"
+                    f"{code}}});</script>")
+        return m.group(0)
+
+    return SCRIPT.sub(rewrite, html)
+
+
+def optimize_page(html, critical):
+    """Inline ``critical`` CSS, load stylesheets asynchronously and defer scripts."""
+    if critical:
+        first = True
+
+        def replace(m):
+            nonlocal first
+            tags = (f'<style>{critical}</style>' if first else '') + async_stylesheet(m.group(3))
+            first = False
+            return tags
+
+        html = STYLESHEET_LINK.sub(replace, html)
+    return defer_scripts(html)
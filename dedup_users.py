@@ -0,0 +1,70 @@
+"""One-time dedup/compaction of data/users.json.
+
+Usage:
+    python dedup_users.py [path/to/users.json] [--dry-run]
+
+Groups users by normalized email (stripped, case-folded) and merges each group
+into a single record. The kept record is the one with the strongest status
+(approved > pending > rejected), then the earliest registration. Fields
+missing from it are filled in from the duplicates, and course progress keeps
+the highest percent per course. The original file is saved as
+``users.json.bak`` before it is rewritten.
+"""
+import os
+import shutil
+import sys
+
+import jsonio
+from user_store import normalize_email
+
+STATUS_RANK = {'approved': 0, 'pending': 1, 'rejected': 2}
+
+
+def _rank(user):
+    return STATUS_RANK.get(user.get('status'), 3), user.get('registered_at') or ''
+
+
+def merge_group(group):
+    ordered = sorted(group, key=_rank)
+    merged = dict(ordered[0])
+    progress = {}
+    for u in ordered:
+        for key, value in u.items():
+            merged.setdefault(key, value)
+        for course, percent in (u.get('progress') or {}).items():
+            progress[course] = max(percent, progress.get(course, percent))
+    if progress:
+        merged['progress'] = progress
+    return merged
+
+
+def dedup(users):
+    """Return (deduplicated users in original order, number of records removed)."""
+    groups = {}
+    order = []
+    for u in users:
+        key = normalize_email(u.get('email'))
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(u)
+    out = [merge_group(groups[key]) for key in order]
+    return out, len(users) - len(out)
+
+
+def main(argv):
+    dry_run = '--dry-run' in argv
+    args = [a for a in argv if a != '--dry-run']
+    path = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'users.json')
+    users, _raw = jsonio.read_file(path)
+    out, removed = dedup(users)
+    print(f"✓ {len(users)} records, {len(out)} unique emails, {removed} duplicates merged")
+    if dry_run or not removed:
+        return
+    shutil.copy2(path, path + '.bak')
+    jsonio.write_file(path, out)
+    print(f"✓ wrote {path} (backup at {path}.bak)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
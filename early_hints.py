@@ -0,0 +1,77 @@
+"""``Link: rel=preload`` headers and 103 Early Hints for HTML pages.
+
+A browser only discovers ``style.css``, ``script.js`` and ``auth.js`` once
+the HTML arrives, and the HTML of a protected page waits on the auth check.
+``page_links()`` lists the assets a page references, as ``Link`` header
+values; the server keeps them per page (its asset manifest) and
+``EarlyHintsMiddleware`` announces them:
+
+- in a ``103 Early Hints`` response sent before the route runs, when the
+  ASGI server offers the ``http.response.early_hint`` extension (Hypercorn,
+  ``hypercorn server_fastapi:app``, does; uvicorn does not);
+- in a ``Link`` header on the final 200 response, which HTTP/2 front
+  proxies and CDNs can turn into early hints or pushes of their own.
+"""
+import re
+from urllib.parse import urljoin
+
+EXTENSION = 'http.response.early_hint'
+TAG = re.compile(r'<(link|script)\b([^>]*)>', re.I)
+ATTR = re.compile(r'''\b([\w-]+)\s*=\s*(["'])(.*?)\2''', re.S)
+
+
+def page_assets(html, page_url='/'):
+    """Return ``[(url, as)]`` for the stylesheets and scripts ``html`` loads, in order.
+
+    Relative references are resolved against ``page_url``; other origins are
+    skipped since a preload for them needs a crossorigin decision per asset.
+    """
+    assets = []
+    for tag, attrs in TAG.findall(html):
+        attrs = {name.lower(): value for name, _q, value in ATTR.findall(attrs)}
+        if tag.lower() == 'script':
+            url, kind = attrs.get('src'), 'script'
+        elif attrs.get('rel') == 'stylesheet' or (attrs.get('rel') == 'preload' and attrs.get('as') == 'style'):
+            url, kind = attrs.get('href'), 'style'
+        else:
+            continue
+        if not url:
+            continue
+        url = urljoin(page_url, url)
+        if url.startswith('/') and not url.startswith('//') and (url, kind) not in assets:
+            assets.append((url, kind))
+    return assets
+
+
+def page_links(html, page_url='/'):
+    """``Link`` header values preloading every asset of a page."""
+    return [f'<{url}>; rel=preload; as={kind}' for url, kind in page_assets(html, page_url)]
+
+
+class EarlyHintsMiddleware:
+    """ASGI middleware sending the preload links ``links_for(path)`` returns for GETs."""
+
+    def __init__(self, app, links_for):
+        self.app = app
+        self.links_for = links_for
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'GET':
+            return await self.app(scope, receive, send)
+        links = self.links_for(scope['path'])
+        if not links:
+            return await self.app(scope, receive, send)
+        encoded = [link.encode('latin-1') for link in links]
+        if EXTENSION in scope.get('extensions', {}):
+            await send({'type': EXTENSION, 'links': encoded})
+        header = b', '.join(encoded)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start' and message['status'] == 200:
+                headers = list(message.get('headers', []))
+                if not any(name.lower() == b'link' for name, _value in headers):
+                    headers.append((b'link', header))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,111 @@
+"""Cache headers and purge-on-edit for a caching reverse proxy in front of the app.
+
+Public pages (the index and ``/concepts/{slug}``) carry ``Cache-Control``
+with an ``s-maxage`` for shared caches and a ``Surrogate-Key`` header naming
+what they depend on:
+
+- ``pages``: every cacheable page;
+- ``index``: the home page;
+- ``concepts`` and ``concept-<id>``: concept pages, keyed by id so a purge
+  also covers a slug the concept was renamed from.
+
+When ``TA_CACHE_PURGE_URL`` points at the proxy (for example
+``http://127.0.0.1:6081``), concept edits call ``purge()``. It queues one
+``PURGE`` request carrying the keys in a ``Surrogate-Key`` header, plus one
+``PURGE`` per affected path for proxies that only purge by URL. A
+background thread sends them, so an admin edit never waits on the proxy.
+``varnish.vcl`` implements both forms.
+
+Without a purge URL the shared-cache lifetime falls back to the browser
+one, so a proxy can never serve an edited page for long.
+"""
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import metrics
+
+PURGE_URL = os.environ.get('TA_CACHE_PURGE_URL', '').rstrip('/')
+BROWSER_MAX_AGE = int(os.environ.get('TA_BROWSER_MAX_AGE', 60))
+EDGE_MAX_AGE = int(os.environ.get('TA_EDGE_MAX_AGE', 86400)) if PURGE_URL else BROWSER_MAX_AGE
+CACHE_CONTROL = f'public, max-age={BROWSER_MAX_AGE}, s-maxage={EDGE_MAX_AGE}'
+PURGE_TIMEOUT = 2.0
+PURGE_ATTEMPTS = 3
+
+ALL_KEY = 'pages'
+INDEX_KEY = 'index'
+CONCEPTS_KEY = 'concepts'
+
+
+def concept_key(concept_id):
+    return f'concept-{concept_id}'
+
+
+def cache_headers(*keys):
+    """Headers making a public page cacheable at the edge under ``keys``."""
+    return {'Cache-Control': CACHE_CONTROL, 'Surrogate-Key': ' '.join((ALL_KEY,) + keys)}
+
+
+def concept_headers(concept_id):
+    return cache_headers(CONCEPTS_KEY, concept_key(concept_id))
+
+
+_queue = None
+_lock = threading.Lock()
+
+
+def _send(path, keys):
+    request = urllib.request.Request(PURGE_URL + path, method='PURGE')
+    if keys:
+        request.add_header('Surrogate-Key', ' '.join(keys))
+    for attempt in range(PURGE_ATTEMPTS):
+        try:
+            with urllib.request.urlopen(request, timeout=PURGE_TIMEOUT) as response:
+                return str(response.status)
+        except urllib.error.HTTPError as exc:
+            if exc.code < 500:
+                return str(exc.code)  # e.g. 404: nothing cached under that URL
+        except OSError:
+            pass
+        time.sleep(0.1 * 2 ** attempt)
+    return 'error'
+
+
+def _worker():
+    while True:
+        path, keys = _queue.get()
+        status = _send(path, keys)
+        metrics.inc('ta_cache_purges_total', (('kind', 'key' if keys else 'url'), ('status', status)),
+                    help_text='PURGE requests sent to the caching proxy by outcome')
+        _queue.task_done()
+
+
+def purge(keys=(), paths=()):
+    """Queue purges of ``keys`` and ``paths``; a no-op without TA_CACHE_PURGE_URL."""
+    global _queue
+    if not PURGE_URL:
+        return
+    with _lock:
+        if _queue is None:
+            # started on first use, so a forking master never owns the thread
+            _queue = queue.Queue()
+            threading.Thread(target=_worker, name='edge-cache-purge', daemon=True).start()
+    if keys:
+        _queue.put(('/', tuple(keys)))
+    for path in paths:
+        _queue.put((path, ()))
+
+
+def wait(timeout=None):
+    """Block until queued purges are sent (for scripts and shutdown)."""
+    if _queue is None:
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
@@ -0,0 +1,32 @@
+"""Gunicorn settings for running server_fastapi with preloaded, forked workers.
+
+    pip install gunicorn
+    TA_BUS_DIR=/tmp/ta-bus gunicorn server_fastapi:app
+
+The master imports the app (``preload_app``), warms and freezes the shared
+catalog data (``preload.py``), then forks ``WEB_CONCURRENCY`` uvicorn
+workers. Set ``TA_BUS_DIR`` so workers tell each other about edits.
+"""
+import gc
+import os
+
+import preload
+
+bind = os.environ.get('TA_BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+# Keep the collector from touching (and so copying) objects while the app is
+# imported; it is frozen before the first fork and re-enabled in each worker's lifespan.
+gc.disable()
+
+
+def when_ready(server):
+    seconds = preload.preload()
+    server.log.info('preloaded app data in %.0f ms', seconds * 1000)
+
+
+def pre_fork(server, worker):
+    # replacement workers forked later should not inherit unfrozen garbage
+    gc.freeze()
@@ -0,0 +1,158 @@
+"""Frequency-aware cache of rendered and compressed responses.
+
+Holds the most read concept pages and tutorial pages in memory, ready to
+send, within ``TA_HOT_CACHE_BYTES`` per worker (0 disables it). Entries are
+keyed by URL and content encoding, and carry a version (the catalog
+signature, the page ETag) so edits are never served stale.
+
+Admission follows TinyLFU. Every lookup counts the URL in a small
+count-min sketch whose counters are halved every ``10 * width`` lookups, so
+frequencies follow recent traffic. A response is only built for the cache
+once its URL has been asked for ``ADMIT_AFTER`` times. It then evicts
+least-recently-used entries only if each of them is less frequent than the
+newcomer; otherwise it is not cached. A scan of rarely read guides therefore
+cannot push out the hot set, as it would in a plain LRU.
+
+``ta_hot_cache_requests_total{result}``, ``ta_hot_cache_hit_ratio`` and
+``ta_hot_cache_bytes`` are exported at ``/metrics``; ``bench_hot_cache.py``
+compares hit ratios with an LRU on a Zipf-distributed replay.
+"""
+import gzip
+import os
+from collections import OrderedDict
+
+import metrics
+import static_site
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+BUDGET = int(os.environ.get('TA_HOT_CACHE_BYTES', 32 * 1024 * 1024))
+SKETCH_WIDTH = 1024
+ADMIT_AFTER = 2
+# counters are 4-bit in spirit: capped, and halved by a table lookup when aging
+MAX_COUNT = 15
+HALVE = bytes(i >> 1 for i in range(256))
+SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+
+class FrequencySketch:
+    """Count-min sketch of recent access counts, aged by periodic halving."""
+
+    def __init__(self, width=SKETCH_WIDTH):
+        width = 1 << max(4, (width - 1).bit_length())  # power of two for masking
+        self.mask = width - 1
+        self.rows = [bytearray(width) for _ in SEEDS]
+        self.sample_size = 10 * width
+        self.additions = 0
+
+    def _slots(self, key):
+        h = hash(key)
+        return [((h ^ seed) * 0x9E3779B1 >> 16) & self.mask for seed in SEEDS]
+
+    def increment(self, key):
+        for row, i in zip(self.rows, self._slots(key)):
+            if row[i] < MAX_COUNT:
+                row[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            for row in self.rows:
+                row[:] = row.translate(HALVE)
+            self.additions //= 2
+
+    def estimate(self, key):
+        return min(row[i] for row, i in zip(self.rows, self._slots(key)))
+
+
+def negotiate(accept_encoding):
+    """The encoding to cache and send for an Accept-Encoding header, or None."""
+    return static_site.choose_encoding(accept_encoding, ('br', 'gzip') if brotli is not None else ('gzip',))
+
+
+def encode(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=6)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+class HotCache:
+    def __init__(self, budget=BUDGET, width=SKETCH_WIDTH):
+        self.budget = budget
+        self.sketch = FrequencySketch(width)
+        self.entries = OrderedDict()  # (url, encoding) -> (version, body), least recent first
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.budget > 0
+
+    def get(self, url, encoding, version):
+        """Cached body for ``url`` in ``encoding`` at ``version``, else None; counts the access."""
+        self.sketch.increment(url)
+        key = (url, encoding)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            result = 'hit'
+        else:
+            self.misses += 1
+            entry = None
+            result = 'miss'
+        metrics.inc('ta_hot_cache_requests_total', (('result', result),),
+                    help_text='Hot cache lookups by result')
+        metrics.set_gauge('ta_hot_cache_hit_ratio', (), round(self.hits / (self.hits + self.misses), 4),
+                          'Share of hot cache lookups served from memory')
+        return entry[1] if entry is not None else None
+
+    def admits(self, url):
+        """True once ``url`` is frequent enough that building a cacheable copy is worthwhile."""
+        return self.enabled and self.sketch.estimate(url) >= ADMIT_AFTER
+
+    def put(self, url, encoding, version, body):
+        """Cache ``body`` unless making room would evict something more frequent."""
+        key = (url, encoding)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old[1])
+        if len(body) > self.budget:
+            return False
+        frequency = self.sketch.estimate(url)
+        victims, freed = [], 0
+        for victim in self.entries:
+            if self.size - freed + len(body) <= self.budget:
+                break
+            if self.sketch.estimate(victim[0]) >= frequency:
+                metrics.inc('ta_hot_cache_rejections_total', (),
+                            help_text='Responses not cached because the entries they would evict were hotter')
+                self._update_size()
+                return False
+            victims.append(victim)
+            freed += len(self.entries[victim][1])
+        for victim in victims:
+            del self.entries[victim]
+        if victims:
+            metrics.inc('ta_hot_cache_evictions_total', (), len(victims),
+                        help_text='Entries evicted from the hot cache')
+        self.entries[key] = (version, body)
+        self.size += len(body) - freed
+        self._update_size()
+        return True
+
+    def discard(self, url):
+        """Drop every encoding of ``url``."""
+        for key in [key for key in self.entries if key[0] == url]:
+            self.size -= len(self.entries.pop(key)[1])
+        self._update_size()
+
+    def _update_size(self):
+        metrics.set_gauge('ta_hot_cache_bytes', (), self.size, 'Bytes held by the hot cache')
+
+
+HOT = HotCache()
@@ -0,0 +1,85 @@
+"""JSON serialization used for the data files and pre-encoded API responses.
+
+Uses ``orjson`` when it is installed and the standard library otherwise; both
+produce UTF-8 bytes. Data files are written compact by default (no indent,
+no ASCII escaping). Set ``TA_JSON_PRETTY=1`` to keep the old indented files,
+or use the export tool for a readable copy:
+
+    python jsonio.py pretty data/users.json [out.json]
+    python jsonio.py compact data/users.json
+"""
+import fcntl
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+PRETTY = os.environ.get('TA_JSON_PRETTY', '') not in ('', '0')
+
+
+def dumps(obj, pretty=False):
+    """Serialize to UTF-8 bytes, compact unless ``pretty``."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_file(path):
+    """Return (parsed object, raw bytes) for a JSON file."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return loads(raw), raw
+
+
+def write_file(path, obj, pretty=None):
+    """Atomically write ``obj`` to ``path``; returns the bytes written."""
+    raw = dumps(obj, pretty=PRETTY if pretty is None else pretty)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(raw)
+    os.replace(tmp, path)
+    return raw
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive cross-process lock on ``path`` (via ``path.lock``).
+
+    Wrap read-modify-write cycles in this so concurrent workers or servers
+    sharing a data file never overwrite each other's changes.
+    """
+    fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] not in ('pretty', 'compact'):
+        print(__doc__)
+        return 2
+    obj, _raw = read_file(argv[1])
+    out = argv[2] if len(argv) > 2 else argv[1]
+    raw = write_file(out, obj, pretty=argv[0] == 'pretty')
+    print(f"✓ wrote {out} ({len(raw)} bytes, {argv[0]}, {BACKEND})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
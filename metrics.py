@@ -0,0 +1,155 @@
+"""Per-worker latency histograms and counters exposed in Prometheus text format.
+
+Everything here is plain Python ints and floats updated from the event loop
+thread, so recording a sample is a few list index increments with no locks.
+Each worker process keeps its own numbers and labels them with its pid;
+Prometheus sums them across workers.
+
+Use ``timed(name)`` to decorate hot functions, ``timer(name)`` around a
+block, and ``MetricsMiddleware`` for per-route HTTP latency.
+"""
+import bisect
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# upper bounds in seconds; the final +Inf bucket is implicit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+WORKER = str(os.getpid())
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+# metric name -> (help text, type, {label tuple: Histogram or number})
+_METRICS = {}
+
+
+def _after_fork():
+    # a preloading master forks workers: give each its own pid label and empty series
+    global WORKER
+    WORKER = str(os.getpid())
+    _METRICS.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _family(name, help_text, kind):
+    family = _METRICS.get(name)
+    if family is None:
+        family = _METRICS[name] = (help_text, kind, {})
+    return family[2]
+
+
+def observe(name, labels, seconds, help_text=''):
+    series = _family(name, help_text, 'histogram')
+    hist = series.get(labels)
+    if hist is None:
+        hist = series[labels] = Histogram()
+    hist.observe(seconds)
+
+
+def inc(name, labels, amount=1, help_text=''):
+    series = _family(name, help_text, 'counter')
+    series[labels] = series.get(labels, 0) + amount
+
+
+def set_gauge(name, labels, value, help_text=''):
+    _family(name, help_text, 'gauge')[labels] = value
+
+
+FUNCTION_METRIC = 'ta_function_duration_seconds'
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(FUNCTION_METRIC, (('function', name),), time.perf_counter() - start,
+                'Time spent in instrumented hot-path functions')
+
+
+def timed(name):
+    """Decorator recording each call's duration under ``function=name``."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(FUNCTION_METRIC, (('function', name),), time.perf_counter() - start,
+                        'Time spent in instrumented hot-path functions')
+        return wrapper
+    return decorate
+
+
+def _labels(labels, extra=()):
+    pairs = (('worker', WORKER),) + tuple(labels) + tuple(extra)
+    return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', r'\\').replace('"', r'\"'))
+                          for k, v in pairs) + '}'
+
+
+def render():
+    """Return all metrics in Prometheus text exposition format."""
+    lines = []
+    for name, (help_text, kind, series) in sorted(_METRICS.items()):
+        if help_text:
+            lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in list(series.items()):
+            if kind != 'histogram':
+                lines.append(f'{name}{_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), value.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {value.sum}')
+            lines.append(f'{name}_count{_labels(labels)} {value.count}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            # label by template (/pages/{page_path:path}) so cardinality stays bounded
+            path = getattr(route, 'path', None) or 'unmatched'
+            observe('ta_http_request_duration_seconds', (('route', path),),
+                    time.perf_counter() - start, 'HTTP request latency by route')
+            inc('ta_http_requests_total', (('route', path), ('method', scope['method']), ('status', status)),
+                help_text='HTTP requests by route, method and status')
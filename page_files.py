@@ -0,0 +1,266 @@
+"""Page registry for the tutorial pages and a low-syscall file response.
+
+The ``pages/`` tree is scanned once, on first use, into a PageRegistry mapping
+each servable path to its metadata: public/protected flag, content type,
+ETag and, for small files, the bytes themselves. Serving a page is a single
+dict lookup; unknown paths are rejected without touching the filesystem.
+An optional polling thread picks up edited, added or removed pages.
+
+Files too large to cache are sent with the ASGI zero-copy (``sendfile``) or
+path-send extensions when the server offers them and chunked reads
+otherwise. Single byte ranges, ``If-Range`` and ``If-None-Match`` are
+honoured.
+"""
+import hashlib
+import mimetypes
+import os
+import threading
+from email.utils import formatdate
+
+import anyio
+from starlette.responses import Response
+
+CHUNK_SIZE = 64 * 1024
+# Files up to this size are held in memory and served without any syscalls
+CACHE_LIMIT = int(os.environ.get('TA_PAGE_CACHE_LIMIT', 256 * 1024))
+# Pages anyone may open; everything else requires an approved user
+PUBLIC_PAGES = frozenset(('register.html', 'admin.html', 'login.html'))
+# Types for the files pages/ actually holds; anything else falls back to mimetypes,
+# whose first lookup reads the system MIME tables
+MEDIA_TYPES = {'.html': 'text/html', '.css': 'text/css', '.js': 'text/javascript',
+               '.json': 'application/json', '.png': 'image/png', '.svg': 'image/svg+xml',
+               '.txt': 'text/plain'}
+
+
+def media_type(name):
+    ext = os.path.splitext(name)[1].lower()
+    return MEDIA_TYPES.get(ext) or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+class PageFile:
+    """Metadata (and optionally contents) for one servable file."""
+
+    __slots__ = ('name', 'path', 'size', 'mtime', 'etag', 'last_modified', 'media_type',
+                 'public', 'body', 'sections', 'links')
+
+    def __init__(self, name, path, st, public=False, body=None):
+        self.name = name
+        self.path = path
+        self.size = st.st_size
+        self.mtime = st.st_mtime_ns
+        self.last_modified = formatdate(st.st_mtime, usegmt=True)
+        self.media_type = media_type(name)
+        self.public = public
+        self.body = body
+        self.sections = None  # <h2> split points, filled in on first use
+        self.links = None  # preload Link values for its assets (see early_hints.py)
+        if body is not None:
+            self.size = len(body)
+            self.etag = '"%s"' % hashlib.sha1(body).hexdigest()[:20]
+        else:
+            self.etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+    def text(self):
+        if self.body is not None:
+            return self.body.decode('utf-8')
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def load_page(pages_dir, name, public_pages=PUBLIC_PAGES, cache_limit=CACHE_LIMIT):
+    path = os.path.join(pages_dir, name)
+    st = os.stat(path)
+    body = None
+    if st.st_size <= cache_limit:
+        with open(path, 'rb') as f:
+            body = f.read()
+    return PageFile(name, path, st, public=os.path.basename(name) in public_pages, body=body)
+
+
+def _newer_build(built_dir, name, source):
+    """True if ``built_dir`` holds a copy of ``name`` at least as new as ``source``."""
+    try:
+        return os.stat(os.path.join(built_dir, name)).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def scan_pages(pages_dir, previous=None, built_dir=None, private_dir=None, **options):
+    """Return ``{relative path: PageFile}`` for every regular file under ``pages_dir``.
+
+    When ``built_dir`` (for public pages) or ``private_dir`` (for protected
+    ones) holds an up-to-date processed copy of a page (asset references
+    rewritten by the static build), that copy is served instead; only names
+    present in ``pages_dir`` are ever served. Entries from
+    ``previous`` whose path, size and mtime are unchanged are reused rather
+    than re-read.
+    """
+    previous = previous or {}
+    public_pages = options.get('public_pages', PUBLIC_PAGES)
+    pages = {}
+    for root, _dirs, files in os.walk(pages_dir):
+        for fname in files:
+            name = os.path.relpath(os.path.join(root, fname), pages_dir).replace(os.sep, '/')
+            base = pages_dir
+            build = built_dir if os.path.basename(name) in public_pages else private_dir
+            if build is not None and _newer_build(build, name, os.path.join(root, fname)):
+                base = build
+            path = os.path.join(base, name)
+            old = previous.get(name)
+            if old is not None and old.path == path:
+                st = os.stat(path)
+                if st.st_mtime_ns == old.mtime and st.st_size == old.size:
+                    pages[name] = old
+                    continue
+            pages[name] = load_page(base, name, **options)
+    return pages
+
+
+class PageRegistry:
+    """Map of allowed page paths to PageFile metadata, built on first lookup."""
+
+    def __init__(self, pages_dir, **options):
+        self.pages_dir = pages_dir
+        self.options = options
+        self._pages = None
+        self._poller = None
+
+    @property
+    def pages(self):
+        if self._pages is None:
+            self._pages = scan_pages(self.pages_dir, **self.options)
+        return self._pages
+
+    @pages.setter
+    def pages(self, pages):
+        self._pages = pages
+
+    def get(self, name):
+        return self.pages.get(name)
+
+    def reload(self):
+        """Rescan the directory; returns True if anything changed."""
+        pages = scan_pages(self.pages_dir, previous=self.pages, **self.options)
+        changed = pages.keys() != self.pages.keys() or any(
+            pages[name] is not self.pages[name] for name in pages)
+        # swap the whole dict so readers never see a half-built registry
+        self.pages = pages
+        return changed
+
+    def start_polling(self, interval):
+        """Reload every ``interval`` seconds from a daemon thread."""
+        if self._poller is not None:
+            return
+        stop = threading.Event()
+
+        def poll():
+            while not stop.wait(interval):
+                try:
+                    self.reload()
+                except OSError:
+                    pass  # a file vanished mid-scan; pick it up next round
+
+        self._poller = stop
+        threading.Thread(target=poll, name='page-registry-poll', daemon=True).start()
+
+    def stop_polling(self):
+        if self._poller is not None:
+            self._poller.set()
+            self._poller = None
+
+
+def parse_range(value, size):
+    """Parse a single ``bytes=`` range into (start, end) inclusive.
+
+    Returns None when the header should be ignored (multiple ranges or
+    malformed) and raises ValueError when the range cannot be satisfied.
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    first, last = first.strip(), last.strip()
+    if not sep or (last and not last.isdigit()) or not (first.isdigit() or (first == '' and last)):
+        return None
+    if first == '':
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError('range not satisfiable')
+    end = int(last) if last else size - 1
+    return start, min(end, size - 1)
+
+
+class PageFileResponse(Response):
+    """Serve a PageFile using its cached metadata."""
+
+    def __init__(self, page, headers=None):
+        super().__init__(status_code=200, headers=headers, media_type=page.media_type)
+        self.page = page
+
+    async def __call__(self, scope, receive, send):
+        page = self.page
+        request_headers = dict(scope.get('headers') or ())
+        self.headers['etag'] = page.etag
+        self.headers['last-modified'] = page.last_modified
+        self.headers['accept-ranges'] = 'bytes'
+
+        if request_headers.get(b'if-none-match', b'').decode('latin-1') == page.etag:
+            del self.headers['content-type']
+            await send({'type': 'http.response.start', 'status': 304, 'headers': self.raw_headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        status, start, count = 200, 0, page.size
+        range_header = request_headers.get(b'range')
+        if_range = request_headers.get(b'if-range')
+        if range_header and (if_range is None or if_range.decode('latin-1') == page.etag):
+            try:
+                byte_range = parse_range(range_header.decode('latin-1'), page.size)
+            except ValueError:
+                self.headers['content-range'] = f'bytes */{page.size}'
+                self.headers['content-length'] = '0'
+                await send({'type': 'http.response.start', 'status': 416, 'headers': self.raw_headers})
+                await send({'type': 'http.response.body', 'body': b''})
+                return
+            if byte_range is not None:
+                status = 206
+                start, count = byte_range[0], byte_range[1] - byte_range[0] + 1
+                self.headers['content-range'] = f'bytes {byte_range[0]}-{byte_range[1]}/{page.size}'
+
+        self.headers['content-length'] = str(count)
+        await send({'type': 'http.response.start', 'status': status, 'headers': self.raw_headers})
+        if scope.get('method') == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        if page.body is not None:
+            await send({'type': 'http.response.body', 'body': page.body[start:start + count]})
+            return
+
+        extensions = scope.get('extensions') or {}
+        if status == 200 and 'http.response.pathsend' in extensions:
+            await send({'type': 'http.response.pathsend', 'path': page.path})
+            return
+        with open(page.path, 'rb') as f:
+            if 'http.response.zerocopysend' in extensions:
+                await send({'type': 'http.response.zerocopysend', 'file': f,
+                            'offset': start, 'count': count})
+                return
+            if start:
+                f.seek(start)
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+            if remaining > 0:
+                # file shrank since the scan; terminate the body cleanly
+                await send({'type': 'http.response.body', 'body': b''})
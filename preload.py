@@ -0,0 +1,51 @@
+"""Build shared read-mostly state in a master process before it forks workers.
+
+``uvicorn --workers N`` spawns fresh interpreters, so every worker imports
+the app and parses ``concepts.json``, the page registry and the user store on
+its own. Under gunicorn with ``preload_app`` (see ``gunicorn.conf.py``) the
+master imports the app once, ``warm()`` fills the caches that are otherwise
+built lazily, and ``gc.freeze()`` moves every object created so far into the
+permanent generation. Workers forked afterwards share those pages
+copy-on-write; without the freeze the first full collection in each worker
+would write to every object header and un-share them.
+
+Per-process resources (bus socket, page poller thread, progress-store file
+handle, metrics series) are opened after the fork, in the app lifespan or
+``os.register_at_fork`` hooks.
+"""
+import gc
+import time
+
+
+def warm(app_module=None):
+    """Import the app and build everything it otherwise initializes on first use.
+
+    Returns the app module.
+    """
+    if app_module is None:
+        import server_fastapi as app_module
+    for concept in app_module.CONCEPTS.all():
+        app_module.CONCEPTS.section_points(concept)
+    app_module.USERS.all()
+    app_module.PAGES.get('index.html')
+    app_module.get_progress()
+    app_module.static_manifest()
+    app_module.asset_bundle.load_manifest()
+    app_module.build_asset_links()
+    app_module.sessions.get_secret()
+    app_module.sessions.REVOCATIONS.refresh()
+    return app_module
+
+
+def freeze():
+    """Collect once, then exempt every surviving object from future collections."""
+    gc.collect()
+    gc.freeze()
+
+
+def preload():
+    """Warm and freeze in one step; returns the seconds spent."""
+    start = time.perf_counter()
+    warm()
+    freeze()
+    return time.perf_counter() - start
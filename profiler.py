@@ -0,0 +1,111 @@
+"""Time-bounded stack-sampling profiler for a live worker.
+
+A daemon thread snapshots every other thread's Python stack with
+``sys._current_frames()`` at a fixed interval and counts identical stacks.
+The result is written in collapsed-stack format (``frame;frame;frame count``
+per line), which ``flamegraph.pl``, speedscope and similar tools read
+directly.
+
+Overhead is bounded by construction. A run lasts at most ``MAX_SECONDS``, and
+the sampler stretches its sleep so that time spent sampling stays under
+``MAX_OVERHEAD`` of wall time.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from core.storage import DATA_DIR
+
+PROFILE_DIR = os.path.join(DATA_DIR, 'profiles')
+MAX_SECONDS = 60.0
+MIN_INTERVAL = 0.001
+MAX_OVERHEAD = 0.05
+MAX_DEPTH = 128
+
+
+def _frame_label(frame):
+    # function granularity (no line numbers) so samples from one call merge
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)})'
+
+
+def collapse(frame, thread_name):
+    """Return a ``root;...;leaf`` stack string for a frame."""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self, profile_dir=PROFILE_DIR):
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self._running = None
+        self.last = None
+
+    def status(self):
+        return {'running': self._running, 'last': self.last}
+
+    def start(self, seconds=10.0, interval=0.005):
+        """Start a profile; returns its status dict or raises RuntimeError if one is running."""
+        seconds = min(max(float(seconds), 0.1), MAX_SECONDS)
+        interval = min(max(float(interval), MIN_INTERVAL), seconds)
+        with self._lock:
+            if self._running is not None:
+                raise RuntimeError('a profile is already running')
+            self._running = {
+                'pid': os.getpid(),
+                'started_at': datetime.utcnow().isoformat() + 'Z',
+                'seconds': seconds,
+                'interval': interval,
+            }
+        thread = threading.Thread(target=self._run, args=(seconds, interval),
+                                  name='sampling-profiler', daemon=True)
+        thread.start()
+        return self._running
+
+    def _run(self, seconds, interval):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        busy = 0.0
+        start = time.monotonic()
+        deadline = start + seconds
+        try:
+            while time.monotonic() < deadline:
+                t0 = time.perf_counter()
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for tid, frame in sys._current_frames().items():
+                    if tid != own:
+                        stacks[collapse(frame, names.get(tid, f'thread-{tid}'))] += 1
+                samples += 1
+                cost = time.perf_counter() - t0
+                busy += cost
+                # keep sampling cost below MAX_OVERHEAD of wall time, but stop on time
+                pause = max(interval, cost / MAX_OVERHEAD)
+                time.sleep(max(0.0, min(pause, deadline - time.monotonic())))
+            path = self._write(stacks)
+            elapsed = time.monotonic() - start
+            self.last = dict(self._running, path=path, samples=samples, unique_stacks=len(stacks),
+                             overhead=round(busy / elapsed, 4) if elapsed else 0.0)
+        finally:
+            with self._lock:
+                self._running = None
+
+    def _write(self, stacks):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(self.profile_dir, f'profile-{os.getpid()}-{stamp}.folded')
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+
+PROFILER = SamplingProfiler()
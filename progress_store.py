@@ -0,0 +1,254 @@
+"""Columnar, memory-mapped store for per-course learner progress.
+
+Progress percentages live in a fixed-width ``users x courses`` matrix of
+bytes in ``data/progress.bin``, memory-mapped so that reading or updating
+one learner's percent for one course is a single byte access. Rows and
+columns are assigned on first use. Course names are recorded in the small
+``data/progress_index.json``; user ids are appended one per line to
+``data/progress_users.txt``, whose line order is the row order, so adding a
+learner is one short append however many there are, and other workers read
+only the lines added since they last looked.
+
+``column(course)`` returns a whole course column, as a NumPy array when NumPy
+is installed, so analytics can scan it at memory bandwidth. NumPy is imported
+on the first such call, not at startup.
+
+Layout of ``progress.bin``: a 16-byte header (magic, version, row capacity,
+column capacity) followed by row-major ``uint8`` cells. ``UNSET`` (255)
+marks a course the learner has not started.
+"""
+import fcntl
+import mmap
+import os
+import struct
+
+import jsonio
+
+_numpy = False  # not looked up yet
+
+HEADER = struct.Struct('<4sHxxII')
+MAGIC = b'TAPG'
+VERSION = 1
+UNSET = 255
+INITIAL_ROWS = 1024
+COURSE_CAPACITY = int(os.environ.get('TA_PROGRESS_COURSES', 256))
+
+
+def numpy_module():
+    """NumPy if installed, else None; imported on first use."""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # optional dependency
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+class CourseLimitReached(ValueError):
+    """Raised when a new course would exceed the matrix's column capacity."""
+
+
+class ProgressStore:
+    def __init__(self, bin_path, index_path, users_path, cols=COURSE_CAPACITY):
+        self.bin_path = bin_path
+        self.index_path = index_path
+        self.users_path = users_path
+        self.created = not os.path.exists(bin_path)
+        if self.created:
+            self._create(cols)
+        self._fd = os.open(bin_path, os.O_RDWR)
+        self._users_fd = os.open(users_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self._map = None
+        self._remap()
+        self.courses = []
+        self.users = []
+        self._course_col = {}
+        self._user_row = {}
+        self._index_mtime = None
+        self._users_read = 0  # bytes of the users file consumed so far
+        self._migrate_index()
+        self._load_index()
+        # flock locks belong to the open file, which forked workers would share
+        os.register_at_fork(after_in_child=self._reopen)
+
+    # -- file management -------------------------------------------------
+
+    def _create(self, cols):
+        os.makedirs(os.path.dirname(self.bin_path), exist_ok=True)
+        tmp = f'{self.bin_path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, INITIAL_ROWS, cols))
+            f.write(bytes([UNSET]) * (INITIAL_ROWS * cols))
+        try:
+            os.link(tmp, self.bin_path)  # fails if another worker created it first
+        except FileExistsError:
+            pass
+        os.remove(tmp)
+        if not os.path.exists(self.index_path):
+            jsonio.write_file(self.index_path, {'courses': []})
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        magic, version, self.rows, self.cols = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.bin_path} is not a progress matrix')
+
+    def _reopen(self):
+        self._map.close()
+        self._map = None
+        os.close(self._fd)
+        self._fd = os.open(self.bin_path, os.O_RDWR)
+        self._remap()
+
+    def _migrate_index(self):
+        """Move user ids from an index written by an earlier version to the users file."""
+        index, _raw = jsonio.read_file(self.index_path)
+        if 'users' not in index:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            index, _raw = jsonio.read_file(self.index_path)  # another worker may have done it
+            if 'users' in index:
+                if index['users'] and not os.fstat(self._users_fd).st_size:
+                    os.write(self._users_fd, ''.join(f'{u}\n' for u in index['users']).encode('utf-8'))
+                jsonio.write_file(self.index_path, {'courses': index['courses']})
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _load_index(self):
+        mtime = os.stat(self.index_path).st_mtime_ns
+        if mtime != self._index_mtime:
+            index, _raw = jsonio.read_file(self.index_path)
+            self.courses = index['courses']
+            self._course_col = {c: i for i, c in enumerate(self.courses)}
+            self._index_mtime = mtime
+        size = os.fstat(self._users_fd).st_size
+        if size > self._users_read:
+            data = os.pread(self._users_fd, size - self._users_read, self._users_read)
+            end = data.rfind(b'\n') + 1  # a line being appended right now is read next time
+            for user_id in data[:end].decode('utf-8').splitlines():
+                self._user_row[user_id] = len(self.users)
+                self.users.append(user_id)
+            self._users_read += end
+
+    def _locked_append(self, user_id=None, course=None):
+        """Assign a row and/or column under an exclusive lock shared by all workers."""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            self._load_index()  # another worker may have added it meanwhile
+            if course is not None and course not in self._course_col:
+                if len(self.courses) >= self.cols:
+                    raise CourseLimitReached(course)
+                self._course_col[course] = len(self.courses)
+                self.courses.append(course)
+                jsonio.write_file(self.index_path, {'courses': self.courses})
+                self._index_mtime = os.stat(self.index_path).st_mtime_ns
+            if user_id is not None and user_id not in self._user_row:
+                if len(self.users) >= self.rows:
+                    self._grow(max(self.rows * 2, len(self.users) + 1))
+                line = f'{user_id}\n'.encode('utf-8')
+                os.write(self._users_fd, line)
+                self._users_read += len(line)
+                self._user_row[user_id] = len(self.users)
+                self.users.append(user_id)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _grow(self, rows):
+        self._remap()
+        if rows <= self.rows:
+            return
+        old_size = HEADER.size + self.rows * self.cols
+        new_size = HEADER.size + rows * self.cols
+        os.ftruncate(self._fd, new_size)
+        self._remap()
+        self._map[old_size:new_size] = bytes([UNSET]) * (new_size - old_size)
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, rows, self.cols)
+        self.rows = rows
+
+    def _row(self, user_id, create=False):
+        row = self._user_row.get(user_id)
+        if row is None:
+            self._load_index()
+            row = self._user_row.get(user_id)
+        if row is None and create:
+            self._locked_append(user_id=user_id)
+            row = self._user_row[user_id]
+        if row is not None and row >= self.rows:
+            self._remap()  # another worker grew the file
+        return row
+
+    def _col(self, course, create=False):
+        col = self._course_col.get(course)
+        if col is None:
+            self._load_index()
+            col = self._course_col.get(course)
+        if col is None and create:
+            self._locked_append(course=course)
+            col = self._course_col[course]
+        return col
+
+    # -- public API ------------------------------------------------------
+
+    def set(self, user_id, course, percent):
+        """Record ``percent`` (0-100) for a learner and course: one byte write."""
+        col = self._col(course, create=True)
+        row = self._row(user_id, create=True)
+        self._map[HEADER.size + row * self.cols + col] = percent
+
+    def get(self, user_id):
+        """Return ``{course: percent}`` for one learner (empty if unknown)."""
+        row = self._row(user_id)
+        if row is None:
+            return {}
+        self._load_index()
+        start = HEADER.size + row * self.cols
+        cells = self._map[start:start + len(self.courses)]
+        return {course: cells[i] for i, course in enumerate(self.courses) if cells[i] != UNSET}
+
+    def column(self, course):
+        """Return one course's cells for all learners in row order (UNSET = not started)."""
+        self._load_index()
+        col = self._course_col.get(course)
+        n = len(self.users)
+        numpy = numpy_module()
+        if col is None:
+            return numpy.full(n, UNSET, dtype=numpy.uint8) if numpy is not None else bytes([UNSET]) * n
+        if self.rows < n:
+            self._remap()
+        if numpy is not None:
+            matrix = numpy.frombuffer(self._map, dtype=numpy.uint8, count=self.rows * self.cols,
+                                      offset=HEADER.size).reshape(self.rows, self.cols)
+            # copy so no view pins the mmap (it must stay closable for remaps)
+            return matrix[:n, col].copy()
+        return bytes(self._map[HEADER.size + col:HEADER.size + n * self.cols:self.cols])
+
+    def summary(self, course):
+        """Learners started/completed and mean percent for a course."""
+        cells = self.column(course)
+        if numpy_module() is not None:
+            started = cells[cells != UNSET]
+            return {'course': course, 'started': int(started.size),
+                    'completed': int((started == 100).sum()),
+                    'mean_percent': round(float(started.mean()), 2) if started.size else None}
+        started = [c for c in cells if c != UNSET]
+        return {'course': course, 'started': len(started),
+                'completed': sum(1 for c in started if c == 100),
+                'mean_percent': round(sum(started) / len(started), 2) if started else None}
+
+    def flush(self):
+        self._map.flush()
+
+    def import_users(self, users):
+        """Copy nested ``progress`` dicts from user records into the matrix."""
+        imported = 0
+        for u in users:
+            for course, percent in (u.get('progress') or {}).items():
+                self.set(u['id'], course, int(percent))
+                imported += 1
+        self.flush()
+        return imported
@@ -0,0 +1,238 @@
+"""Token-bucket rate limiting for the unauthenticated auth endpoints.
+
+Buckets live in a fixed-size slot table (24 bytes per key: key hash, tokens,
+last refill time) packed into one buffer, so memory stays bounded however
+many clients show up. When the probe window for a key is full, the slot that
+has been idle longest is recycled; an idle bucket has refilled anyway.
+
+The buffer is a local ``bytearray`` by default. Setting ``TA_RATE_SHM`` to a
+shared-memory name places it in ``multiprocessing.shared_memory`` instead,
+guarded by an ``flock`` so limits hold across uvicorn workers on one host.
+
+Limits are ``"<requests>/<seconds>"`` strings, configured per endpoint with
+``TA_RATE_LOGIN`` and ``TA_RATE_REGISTER`` and applied both per client IP
+and per normalized email. The Flask API mounted at ``/legacy`` shares the
+buckets of the endpoint it mirrors.
+
+Behind a reverse proxy (``varnish.vcl``) every request comes from the
+proxy's address. List the proxies in ``TA_TRUSTED_PROXIES`` (comma-separated
+IPs) and, for requests arriving from one of them, the client IP is taken from
+``X-Forwarded-For``: the right-most address that is not itself a trusted
+proxy. The header is ignored from anyone else, so clients cannot pick their
+own bucket.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+SLOT = struct.Struct('<Qdd')  # key hash, tokens, last refill (wall clock, shared across processes)
+PROBE = 8
+MAX_BODY = 64 * 1024
+
+
+def parse_rate(value):
+    """Parse ``"5/60"`` into (capacity, refill per second)."""
+    count, _, period = value.partition('/')
+    count, period = float(count), float(period or 1)
+    if count <= 0 or period <= 0:
+        raise ValueError(f'invalid rate {value!r}')
+    return count, count / period
+
+
+def key_hash(key):
+    h = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+    return h or 1  # 0 marks an empty slot
+
+
+class _LocalLock:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+class _FileLock:
+    def __init__(self, path):
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def __enter__(self):
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class TokenBucketTable:
+    """Fixed-capacity table of token buckets keyed by string."""
+
+    def __init__(self, slots=4096, shm_name=None):
+        self.slots = slots
+        size = slots * SLOT.size
+        if shm_name:
+            self._shm = _attach_shared(shm_name, size)
+            self.buf = self._shm.buf
+            self.lock = _FileLock(os.path.join(tempfile.gettempdir(), f'{shm_name}.lock'))
+        else:
+            self._shm = None
+            self.buf = bytearray(size)
+            self.lock = _LocalLock()
+
+    def take(self, key, capacity, rate, now=None):
+        """Consume one token for ``key``; returns (allowed, seconds until next token)."""
+        now = time.time() if now is None else now
+        h = key_hash(key)
+        start = h % self.slots
+        with self.lock:
+            offset, tokens = None, capacity
+            oldest, oldest_stamp = None, None
+            for i in range(PROBE):
+                probe = ((start + i) % self.slots) * SLOT.size
+                slot_key, slot_tokens, stamp = SLOT.unpack_from(self.buf, probe)
+                if slot_key == h:
+                    offset, tokens = probe, min(capacity, slot_tokens + (now - stamp) * rate)
+                    break
+                if slot_key == 0:
+                    # slots are never freed, so the key cannot live past an empty one
+                    offset = probe
+                    break
+                if oldest_stamp is None or stamp < oldest_stamp:
+                    oldest, oldest_stamp = probe, stamp
+            if offset is None:
+                offset = oldest
+            if tokens >= 1:
+                SLOT.pack_into(self.buf, offset, h, tokens - 1, now)
+                return True, 0.0
+            SLOT.pack_into(self.buf, offset, h, tokens, now)
+            return False, (1 - tokens) / rate
+
+
+def _attach_shared(name, size):
+    from multiprocessing import resource_tracker, shared_memory
+    try:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+    except FileExistsError:
+        shm = shared_memory.SharedMemory(name=name)
+    # Workers come and go; keep the segment alive instead of letting the
+    # resource tracker unlink it when the first worker exits.
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+# paths limited with the buckets of another path
+ALIASES = {'/legacy/api/register': '/api/register'}
+
+
+def trusted_proxies():
+    return frozenset(ip.strip() for ip in os.environ.get('TA_TRUSTED_PROXIES', '').split(',') if ip.strip())
+
+
+def client_ip(scope, trusted=frozenset()):
+    """The peer address or, when the peer is a trusted proxy, the address it forwarded for."""
+    client = scope.get('client')
+    ip = client[0] if client else '-'
+    if ip not in trusted:
+        return ip
+    hops = []
+    for name, value in scope.get('headers') or ():
+        if name == b'x-forwarded-for':
+            hops += value.decode('latin-1').split(',')
+    for hop in reversed(hops):
+        hop = hop.strip()
+        if hop and hop not in trusted:
+            return hop
+    return ip
+
+
+def default_rules():
+    return {
+        '/api/login': parse_rate(os.environ.get('TA_RATE_LOGIN', '10/60')),
+        '/api/register': parse_rate(os.environ.get('TA_RATE_REGISTER', '5/300')),
+    }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 once a client IP or email exhausts its bucket."""
+
+    def __init__(self, app, rules=None, table=None, trusted=None):
+        self.app = app
+        self.rules = default_rules() if rules is None else rules
+        self.trusted = trusted_proxies() if trusted is None else frozenset(trusted)
+        self.table = table or TokenBucketTable(
+            slots=int(os.environ.get('TA_RATE_SLOTS', 4096)),
+            shm_name=os.environ.get('TA_RATE_SHM'))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] != 'POST':
+            return await self.app(scope, receive, send)
+        path = ALIASES.get(scope['path'], scope['path'])
+        rule = self.rules.get(path)
+        if rule is None:
+            return await self.app(scope, receive, send)
+        capacity, rate = rule
+
+        allowed, retry = self.table.take(f'ip:{path}:{client_ip(scope, self.trusted)}', capacity, rate)
+        if not allowed:
+            return await _too_many(send, retry)
+
+        # buffer the (small) JSON body to key on the email, then replay it downstream
+        body = b''
+        more = True
+        while more:
+            message = await receive()
+            if message['type'] != 'http.request':
+                return await self.app(scope, _replay(b'', message, receive), send)
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+            if len(body) > MAX_BODY:
+                return await _respond(send, 413, {'detail': 'request body too large'})
+        email = _email_from(body)
+        if email:
+            allowed, retry = self.table.take(f'email:{path}:{email}', capacity, rate)
+            if not allowed:
+                return await _too_many(send, retry)
+        await self.app(scope, _replay(body, None, receive), send)
+
+
+def _email_from(body):
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    email = payload.get('email') if isinstance(payload, dict) else None
+    if not isinstance(email, str):
+        return None
+    return email.strip().casefold() or None
+
+
+def _replay(body, pending, receive):
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return pending or {'type': 'http.request', 'body': body, 'more_body': False}
+        return await receive()
+    return replay
+
+
+async def _too_many(send, retry_after):
+    await _respond(send, 429, {'detail': 'too many requests'},
+                   [(b'retry-after', str(max(1, int(retry_after + 0.999))).encode('ascii'))])
+
+
+async def _respond(send, status, payload, extra_headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'),
+               (b'content-length', str(len(body)).encode('ascii')), *extra_headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
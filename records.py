@@ -0,0 +1,83 @@
+"""Compact in-memory user records.
+
+``UserRecord`` stores the known user fields in ``__slots__`` instead of a
+per-record dict, and interns the low-cardinality ``course`` and ``status``
+strings so every record shares one copy of each. Unknown keys from older or
+newer files go into a per-record ``extra`` dict that exists only when needed.
+
+Records keep the small mapping interface the endpoints already use
+(``u['status']``, ``u.get('progress')``, ``u.items()``), and ``to_dict()``
+gives back the plain form for JSON serialization.
+"""
+import sys
+
+USER_FIELDS = ('id', 'name', 'email', 'course', 'status', 'registered_at',
+               'approved_at', 'rejected_at', 'access_token', 'progress')
+INTERNED_FIELDS = frozenset(('course', 'status'))
+_MISSING = object()
+
+
+class UserRecord:
+    __slots__ = USER_FIELDS + ('extra',)
+
+    def __init__(self, data=None, **fields):
+        self.extra = None
+        for name in USER_FIELDS:
+            setattr(self, name, _MISSING)
+        for source in (data or {}, fields):
+            for key, value in source.items():
+                self[key] = value
+
+    def __setitem__(self, key, value):
+        if key in INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        if key in USER_FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        if key in USER_FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        if key in USER_FIELDS:
+            setattr(self, key, _MISSING)
+        else:
+            del self.extra[key]
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def items(self):
+        for name in USER_FIELDS:
+            value = getattr(self, name)
+            if value is not _MISSING:
+                yield name, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def keys(self):
+        return [key for key, _value in self.items()]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f'UserRecord({self.to_dict()!r})'
@@ -0,0 +1,85 @@
+"""HTML rendering for concept pages.
+
+Shared by the live ``/concepts/{slug}`` route and the static site export so
+both produce byte-identical pages. ``iter_concept()`` yields the same
+document in pieces (head and header, the content cut at its ``<h2>`` split
+points, footer) so the live route can stream it without building the whole
+string; ``render_concept()`` returns it in one piece.
+"""
+import sections
+from asset_bundle import asset_url, critical_for
+from critical_css import stylesheet_tags
+
+
+def concept_head(concept):
+    """Everything before the concept content: <head>, site header and title banner."""
+    return f"""<!doctype html>
+<html>
+<head>
+    <meta charset='utf-8' />
+    <meta name='viewport' content='width=device-width,initial-scale=1' />
+    <title>{concept.get('title')}</title>
+    {stylesheet_tags([asset_url('css/style.css'), asset_url('css/concept.css')], critical_for('concept'))}
+</head>
+<body>
+    <header>
+        <nav>
+            <div class='logo'>🚀 Test Automation Hub</div>
+            <ul class='nav-menu'>
+                <li><a href='/index.html'>Home</a></li>
+                <li><a href='/pages/login.html'>Login</a></li>
+            </ul>
+        </nav>
+    </header>
+
+    <div class='concept-page'>
+        <a href='/index.html' class='back-button'>← Back to Home</a>
+        
+        <div class='concept-header'>
+            <h1>{concept.get('title')}</h1>
+            <p style='margin: 10px 0 0 0; font-size: 1.1rem;'>Comprehensive tutorial with examples and best practices</p>
+        </div>
+
+        <div class='concept-content'>
+            """
+
+
+def concept_tail(concept):
+    return f"""
+        </div>
+
+        <div style='margin-top: 40px; padding-top: 20px; border-top: 2px solid #f0f0f0; text-align: center; color: #999; font-size: 0.9rem;'>
+            <p>Last updated: {concept.get('updated_at', 'N/A')}</p>
+            <p>© 2025 Test Automation Hub. All rights reserved.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+def content_chunks(content, points=None):
+    """Cut ``content`` at its section starts; the pieces join back to ``content``."""
+    if points is None:
+        points = sections.split_points(content)
+    if not content:
+        return
+    cuts = [p['start'] for p in points if 0 < p['start'] < len(content)]
+    for start, end in zip([0] + cuts, cuts + [len(content)]):
+        yield content[start:end]
+
+
+def iter_concept(concept, points=None):
+    """Yield the document for a concept dict in the order it should be sent."""
+    yield concept_head(concept)
+    content = concept.get('content')
+    if isinstance(content, str):
+        yield from content_chunks(content, points)
+    else:
+        yield str(content)
+    yield concept_tail(concept)
+
+
+def render_concept(concept):
+    """Return the full HTML document for a concept dict."""
+    return concept_head(concept) + str(concept.get('content')) + concept_tail(concept)
@@ -0,0 +1,79 @@
+"""Render-blocking bytes per page, before and after critical-CSS inlining.
+
+Usage:
+    python static_site.py build-assets
+    python report_critical.py
+
+A browser cannot paint until it has the HTML up to ``<body>`` and every
+stylesheet linked in ``<head>``. For each site page and one concept page
+this prints the HTML size, the bytes of blocking stylesheets, the inlined
+critical CSS and the resulting bytes needed before first paint (HTML plus
+blocking CSS), along with how many scripts still block the parser. Sizes
+are gzip-compressed, as sent over the wire; no browser is needed.
+"""
+import gzip
+import json
+import re
+
+import asset_bundle
+import critical_css
+import static_site
+from rendering import render_concept
+
+
+def gz(text):
+    return len(gzip.compress(text.encode('utf-8'), compresslevel=9, mtime=0))
+
+
+def blocking_scripts(html):
+    return sum(1 for attrs, _code in critical_css.SCRIPT.findall(html)
+               if 'src=' in attrs and not re.search(r'\b(defer|async)\b', attrs))
+
+
+def measure(before, after, critical):
+    hrefs = critical_css.stylesheet_hrefs(before)
+    blocking_css = sum(gz(asset_bundle.asset_text(h)) for h in hrefs)
+    # after optimization the only stylesheet links left are the <noscript> fallbacks
+    return {
+        'html before': gz(before), 'html after': gz(after), 'blocking css': blocking_css,
+        'critical': len(critical.encode('utf-8')),
+        'paint before': gz(before) + blocking_css, 'paint after': gz(after),
+        'scripts': f'{blocking_scripts(before)}→{blocking_scripts(after)}',
+    }
+
+
+def main():
+    critical = asset_bundle.load_manifest().get('critical')
+    if not critical:
+        raise SystemExit('✗ no critical CSS in the asset manifest; run `python static_site.py build-assets`')
+    rows = {}
+    for rel in ['index.html'] + static_site.site_pages():
+        kind = critical_css.page_type(rel)
+        rows[rel] = (kind, measure(static_site._read_source(rel),
+                                   static_site.read_page(rel).decode('utf-8'), critical[kind]))
+    try:
+        with open(static_site.CONCEPTS_FILE, 'r', encoding='utf-8') as f:
+            concept = json.load(f)[0]
+        after = render_concept(concept)
+        hrefs = [asset_bundle.asset_url('css/style.css'), asset_bundle.asset_url('css/concept.css')]
+        before = after.replace(critical_css.stylesheet_tags(hrefs, critical['concept']),
+                               critical_css.stylesheet_tags(hrefs, ''))
+        rows[f"/concepts/{concept['slug']}"] = ('concept', measure(before, after, critical['concept']))
+    except (FileNotFoundError, IndexError):
+        pass
+
+    columns = ('html before', 'html after', 'blocking css', 'critical', 'paint before', 'paint after')
+    print('bytes (gzip; "critical" is raw inlined CSS) needed before first paint')
+    print(f"{'page':<32} {'type':<8}" + ''.join(f'{c:>13}' for c in columns) + f"{'sync js':>9}")
+    for page, (kind, row) in rows.items():
+        print(f'{page:<32} {kind:<8}' + ''.join(f'{row[c]:>13}' for c in columns) + f"{row['scripts']:>9}")
+    before = sum(row['paint before'] for _kind, row in rows.values())
+    after = sum(row['paint after'] for _kind, row in rows.values())
+    print(f'✓ first-paint bytes {before} → {after} ({100 * (before - after) / before:.0f}% less) '
+          f'across {len(rows)} pages')
+    for kind in critical_css.PAGE_TYPES:
+        print(f'  {kind:<8} critical CSS {len(critical[kind].encode("utf-8"))} bytes')
+
+
+if __name__ == '__main__':
+    main()
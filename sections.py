@@ -0,0 +1,72 @@
+"""Split long HTML documents at ``<h2>`` headings into addressable sections.
+
+The large guides and concept bodies are tens of kilobytes each. Clients can
+fetch a table of contents, render the first section right away and pull in
+the rest as the reader scrolls. A document is split into an optional
+leading section (everything before the first ``<h2>``, title ``None``) and
+one section per heading, running up to the next heading.
+
+Split points are plain ``{'title', 'id', 'start', 'end'}`` dicts (offsets
+into the text), so they can be kept next to the content they describe:
+concepts in a side index of the ``ConceptCatalog`` (filled by ``save()``,
+never written into the public records), tutorial pages on their ``PageFile``.
+"""
+import html as htmllib
+import re
+
+H2 = re.compile(r'<h2\b([^>]*)>(.*?)</h2\s*>', re.I | re.S)
+ID_ATTR = re.compile(r'''\bid\s*=\s*(["'])(.*?)\1''', re.S)
+TAG = re.compile(r'<[^>]+>')
+SPACE = re.compile(r'\s+')
+BODY_START = re.compile(r'<body\b[^>]*>', re.I)
+BODY_END = re.compile(r'<footer\b|</body\s*>', re.I)
+
+
+def heading_text(markup):
+    return SPACE.sub(' ', htmllib.unescape(TAG.sub('', markup))).strip()
+
+
+def split_points(text, start=0, end=None):
+    """Return the sections of ``text[start:end]`` as split-point dicts."""
+    end = len(text) if end is None else end
+    points = []
+    previous = start
+    for m in H2.finditer(text, start, end):
+        if points:
+            points[-1]['end'] = m.start()
+        elif text[previous:m.start()].strip():
+            points.append({'title': None, 'id': None, 'start': previous, 'end': m.start()})
+        anchor = ID_ATTR.search(m.group(1))
+        points.append({'title': heading_text(m.group(2)), 'id': anchor.group(2) if anchor else None,
+                       'start': m.start(), 'end': end})
+    if not points and text[start:end].strip():
+        points.append({'title': None, 'id': None, 'start': start, 'end': end})
+    return points
+
+
+def page_points(text):
+    """Split points for a full HTML page: the body content, minus the footer."""
+    body = BODY_START.search(text)
+    start = body.end() if body else 0
+    tail = BODY_END.search(text, start)
+    return split_points(text, start, tail.start() if tail else len(text))
+
+
+def is_current(text, points):
+    """Cheap check that stored ``points`` still describe ``text``."""
+    if not points:
+        return not text.strip()
+    return points[-1]['end'] <= len(text) and all(
+        H2.match(text, p['start']) for p in points if p['title'] is not None)
+
+
+def table_of_contents(points):
+    return [{'n': n, 'title': p['title'], 'id': p['id'], 'length': p['end'] - p['start']}
+            for n, p in enumerate(points)]
+
+
+def section(text, points, n):
+    """The markup of section ``n``; raises IndexError when there is no such section."""
+    if not 0 <= n < len(points):
+        raise IndexError(n)
+    return text[points[n]['start']:points[n]['end']]
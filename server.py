@@ -1,38 +1,21 @@
 from flask import Flask, request, jsonify, send_from_directory
 import os
-import json
-from datetime import datetime
-from uuid import uuid4
 
-# Simple Flask server to handle registration and admin approvals
-# Usage: python server.py
+import user_store
+from core import auth, users
+from core.storage import DATA_DIR, USERS
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-USERS_FILE = os.path.join(DATA_DIR, 'users.json')
-ADMIN_TOKEN = os.environ.get('TA_ADMIN_TOKEN', 'admin123')  # change via environment
+# Simple Flask server to handle registration and admin approvals
+# Usage: python server.py   (or mount under server_fastapi with TA_LEGACY_FLASK=1)
+#
+# All reads and writes go through core, the same storage and user service the FastAPI
+# app uses, so both can run against one data directory at the same time.
 
 app = Flask(__name__, static_folder='')
 
-# Ensure data directory and file exist
-os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(USERS_FILE):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f, indent=2)
-
-
-def load_users():
-    with open(USERS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2, ensure_ascii=False)
-
 
 def require_admin(req):
-    token = req.headers.get('X-Admin-Token') or req.args.get('token')
-    return token == ADMIN_TOKEN
+    return auth.is_admin(req.headers.get('X-Admin-Token') or req.args.get('token'))
 
 
 @app.after_request
@@ -46,25 +29,12 @@ def add_cors_headers(response):
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json() or {}
-    name = data.get('name')
-    email = data.get('email')
-    course = data.get('course', 'general')
-
-    if not name or not email:
-        return jsonify({'error': 'name and email are required'}), 400
-
-    users = load_users()
-    user_id = str(uuid4())
-    user = {
-        'id': user_id,
-        'name': name,
-        'email': email,
-        'course': course,
-        'status': 'pending',
-        'registered_at': datetime.utcnow().isoformat() + 'Z'
-    }
-    users.append(user)
-    save_users(users)
+    try:
+        user_id = users.register(data.get('name'), data.get('email'), data.get('course', 'general'))
+    except user_store.DuplicateEmail:
+        return jsonify({'error': 'email already registered'}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     return jsonify({'message': 'registered', 'id': user_id}), 201
 
@@ -73,36 +43,30 @@ def register():
 def list_users():
     if not require_admin(request):
         return jsonify({'error': 'admin token required'}), 401
-    users = load_users()
-    return jsonify(users)
+    # the store keeps the serialized file bytes, so no re-encoding
+    return app.response_class(USERS.raw(), mimetype='application/json')
 
 
 @app.route('/api/users/<user_id>/approve', methods=['POST'])
 def approve_user(user_id):
     if not require_admin(request):
         return jsonify({'error': 'admin token required'}), 401
-    users = load_users()
-    for u in users:
-        if u['id'] == user_id:
-            u['status'] = 'approved'
-            u['approved_at'] = datetime.utcnow().isoformat() + 'Z'
-            save_users(users)
-            return jsonify({'message': 'approved', 'id': user_id})
-    return jsonify({'error': 'user not found'}), 404
+    try:
+        users.approve(user_id)
+    except users.UserNotFound:
+        return jsonify({'error': 'user not found'}), 404
+    return jsonify({'message': 'approved', 'id': user_id})
 
 
 @app.route('/api/users/<user_id>/reject', methods=['POST'])
 def reject_user(user_id):
     if not require_admin(request):
         return jsonify({'error': 'admin token required'}), 401
-    users = load_users()
-    for u in users:
-        if u['id'] == user_id:
-            u['status'] = 'rejected'
-            u['rejected_at'] = datetime.utcnow().isoformat() + 'Z'
-            save_users(users)
-            return jsonify({'message': 'rejected', 'id': user_id})
-    return jsonify({'error': 'user not found'}), 404
+    try:
+        users.reject(user_id)
+    except users.UserNotFound:
+        return jsonify({'error': 'user not found'}), 404
+    return jsonify({'message': 'rejected', 'id': user_id})
 
 
 @app.route('/data/users.json', methods=['GET'])
@@ -110,6 +74,7 @@ def serve_users_file():
     # serve file for convenience (not secure) - admin token required
     if not require_admin(request):
         return jsonify({'error': 'admin token required'}), 401
+    USERS.all()  # creates the file on first use
     return send_from_directory(DATA_DIR, 'users.json')
 
 
@@ -119,6 +84,8 @@ def root():
 
 
 if __name__ == '__main__':
-    print('Starting server on http://127.0.0.1:5000')
-    print('Admin token:', ADMIN_TOKEN)
-    app.run(host='127.0.0.1', port=5000, debug=True)
+    port = int(os.environ.get('PORT', 5000))
+    print(f'Starting server on http://127.0.0.1:{port}')
+    print('Admin token:', auth.ADMIN_TOKEN)
+    # debug mode (reloader, debugger) only when FLASK_DEBUG=1 is set
+    app.run(host='127.0.0.1', port=port)
@@ -1,22 +1,66 @@
 from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import JSONResponse, FileResponse, RedirectResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Match, Route
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import asyncio
+import gc
 import os
-import json
+import re
+import time
 from datetime import datetime
 from uuid import uuid4
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-USERS_FILE = os.path.join(DATA_DIR, 'users.json')
-CONCEPTS_FILE = os.path.join(DATA_DIR, 'concepts.json')
-ADMIN_TOKEN = os.environ.get('TA_ADMIN_TOKEN', 'admin123')  # change via environment
+import access_log
+import activity
+import asset_bundle
+from bus import BUS
+import early_hints
+import edge_cache
+import hot_cache
+from core import auth, users
+from core.storage import CONCEPTS, CONCEPTS_FILE, REVALIDATE_AFTER, USERS, USERS_FILE, get_progress
+import metrics
+import page_files
+import profiler
+import progress_store
+import ratelimit
+import sections
+import sessions
+import static_site
+import user_store
+from rendering import concept_head, iter_concept, render_concept
 
 # Base directory for static site files (the tutorial_website folder)
 BASE_DIR = os.path.dirname(__file__)
 
-app = FastAPI(title='Test Automation Hub - Registration API')
+@asynccontextmanager
+async def lifespan(app):
+    # Runs in each worker after any fork, so threads and sockets are per-process.
+    # A preloading master froze the shared catalog objects; collect normally from here.
+    gc.enable()
+    # multi-worker mode: listen for other workers' change notifications
+    BUS.start(asyncio.get_running_loop())
+    if PAGES_RELOAD > 0:
+        PAGES.start_polling(PAGES_RELOAD)
+    build_asset_links()
+    access_log.ACCESS_LOG.start()
+    activity.ACTIVITY.start()
+    yield
+    await activity.ACTIVITY.stop()
+    PAGES.stop_polling()
+    BUS.stop()
+    edge_cache.wait(timeout=2.0)
+    access_log.ACCESS_LOG.stop()
+
+
+app = FastAPI(title='Test Automation Hub - Registration API', lifespan=lifespan)
+
+# Token-bucket throttling of /api/login and /api/register per client IP and email.
+# Added before CORS so 429 responses still carry CORS headers.
+app.add_middleware(ratelimit.RateLimitMiddleware)
 
 # Allow cross origin from local files
 app.add_middleware(
@@ -27,77 +71,257 @@ app.add_middleware(
     allow_headers=['*'],
 )
 
+# Per-route latency histograms, exposed at /metrics. Times rate limiting, CORS and the
+# route; the access log and early hints middlewares added below wrap it.
+app.add_middleware(metrics.MetricsMiddleware)
+
+# One JSON line per response in TA_ACCESS_LOG, written in batches by a background thread
+app.add_middleware(access_log.AccessLogMiddleware)
+
+class AssetFiles(StaticFiles):
+    """Static files where fingerprinted builds (assets/dist/) are cacheable for a year."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if asset_bundle.is_hashed_path(self.get_path(scope).replace(os.sep, '/')):
+            response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+
 # Mount static folders so the frontend can load assets and pages directly
 # We mount specific prefixes to avoid catching /api routes.
-app.mount('/assets', StaticFiles(directory=os.path.join(BASE_DIR, 'assets')), name='assets')
+app.mount('/assets', AssetFiles(directory=os.path.join(BASE_DIR, 'assets')), name='assets')
 # Do not mount /pages as StaticFiles so we can protect tutorial pages.
 # Public pages (registration/admin) will still be served; other pages require an approved user.
-app.mount('/data', StaticFiles(directory=DATA_DIR), name='data')
+# /data is not mounted either: it holds the session secret and other private state. Only
+# concepts.json (public) and users.json (admin) are exposed, via explicit routes below.
 
-# Ensure data directory and file exist
-os.makedirs(DATA_DIR, exist_ok=True)
-if not os.path.exists(USERS_FILE):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f, indent=2)
-if not os.path.exists(CONCEPTS_FILE):
-    with open(CONCEPTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump([], f, indent=2)
+# The Flask API (server.py) can be served in-process under /legacy for clients that rely
+# on its response format. It shares this process's stores through core, so there is only
+# one writer per worker. Opt in with TA_LEGACY_FLASK=1 (importing Flask slows startup).
+if os.environ.get('TA_LEGACY_FLASK', '') not in ('', '0'):
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError:  # optional dependency; Starlette's (deprecated) adapter also works
+        from starlette.middleware.wsgi import WSGIMiddleware
+    import server as legacy_server
+    app.mount('/legacy', WSGIMiddleware(legacy_server.app), name='legacy')
+
+# Nothing below touches the disk at import time: the data directory, data files (see
+# core.storage), page registry and static manifest are created or read on first use (or
+# by preload.warm()), which keeps cold starts down to the framework import.
+
+# Registry of servable tutorial pages, scanned on first use. Pages rewritten to hashed
+# asset URLs by `python static_site.py build-assets` are served in place of the sources
+# while they are up to date. Set TA_PAGES_RELOAD to a number of seconds to poll pages/
+# for edits (useful while authoring content); the poller starts in lifespan so each
+# worker gets its own thread.
+PAGES_DIR = os.path.join(BASE_DIR, 'pages')
+PAGES = page_files.PageRegistry(PAGES_DIR, built_dir=os.path.join(static_site.STATIC_DIR, 'pages'),
+                                private_dir=os.path.join(static_site.PRIVATE_DIR, 'pages'))
+PAGES_RELOAD = float(os.environ.get('TA_PAGES_RELOAD', '0'))
+
+# Prerendered concept pages written by `python static_site.py build-static`, read by
+# static_manifest() on first use. None when no export exists, in which case concept
+# pages are rendered per request. Like the stores, the manifest is re-read when its
+# mtime or size changes (checked every REVALIDATE_AFTER seconds with the bus on, when
+# other workers announce edits), so a rebuild or another process's edit is picked up.
+STATIC_MANIFEST = None
+STATIC_MANIFEST_SIGNATURE = False  # False: never loaded; None: no manifest file
+STATIC_MANIFEST_CHECKED = 0.0
+
+
+def static_manifest_signature():
+    try:
+        st = os.stat(os.path.join(static_site.STATIC_DIR, static_site.MANIFEST_NAME))
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def static_manifest():
+    global STATIC_MANIFEST, STATIC_MANIFEST_SIGNATURE, STATIC_MANIFEST_CHECKED
+    if REVALIDATE_AFTER and STATIC_MANIFEST_SIGNATURE is not False:
+        now = time.monotonic()
+        if now - STATIC_MANIFEST_CHECKED < REVALIDATE_AFTER:
+            return STATIC_MANIFEST
+        STATIC_MANIFEST_CHECKED = now
+    signature = static_manifest_signature()
+    if signature != STATIC_MANIFEST_SIGNATURE:
+        STATIC_MANIFEST = static_site.load_manifest() if signature is not None else None
+        STATIC_MANIFEST_SIGNATURE = signature
+    return STATIC_MANIFEST
+
+
+# Per-page asset manifest: the preload Link values for the stylesheets and scripts of
+# each HTML page, sent as headers and 103 Early Hints by EarlyHintsMiddleware. Built
+# at startup; a page file the registry reloads gets its links on first request.
+INDEX_LINKS = None
+CONCEPT_LINKS = None
+
+
+def index_links():
+    global INDEX_LINKS
+    if INDEX_LINKS is None:
+        entry = (static_manifest() or {'files': {}})['files'].get('/index.html')
+        path = os.path.join(static_site.STATIC_DIR, entry['file']) if entry else os.path.join(BASE_DIR, 'index.html')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                INDEX_LINKS = early_hints.page_links(f.read())
+        except FileNotFoundError:
+            INDEX_LINKS = []
+    return INDEX_LINKS
+
+
+def concept_links():
+    global CONCEPT_LINKS
+    manifest = asset_bundle.load_manifest()
+    if CONCEPT_LINKS is None or CONCEPT_LINKS[0] is not manifest:
+        # every concept page shares the same head; rebuilt when the assets are
+        CONCEPT_LINKS = manifest, early_hints.page_links(concept_head({}))
+    return CONCEPT_LINKS[1]
+
+
+def asset_links(path):
+    if path in ('/', '/index.html', '/index'):
+        return index_links()
+    if path.startswith('/concepts/'):
+        return concept_links()
+    if path.startswith('/pages/'):
+        page = PAGES.get(path[len('/pages/'):])
+        if page is not None and page.media_type == 'text/html':
+            if page.links is None:
+                page.links = early_hints.page_links(page.text(), path)
+            return page.links
+    return None
+
+
+def build_asset_links():
+    index_links()
+    concept_links()
+    for name in list(PAGES.pages):
+        asset_links(f'/pages/{name}')
+
+
+# Outermost, so the 103 goes out before the auth check and page generation
+app.add_middleware(early_hints.EarlyHintsMiddleware, links_for=asset_links)
 
 
 def load_concepts():
-    with open(CONCEPTS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    # cached by the catalog; edit inside CONCEPTS.transaction() and save_concepts
+    return CONCEPTS.all()
 
 
 def save_concepts(concepts):
-    with open(CONCEPTS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(concepts, f, indent=2, ensure_ascii=False)
+    CONCEPTS.save(concepts)
+
+
+def static_response(url: str, request: Request, cache_keys=None):
+    """Return a FileResponse for an exported page (precompressed when accepted), else None.
+
+    With ``cache_keys`` the page is marked cacheable at the edge under those
+    surrogate keys (plus its concept's, for concept pages).
+    """
+    manifest = static_manifest()
+    if manifest is None:
+        return None
+    entry = manifest['files'].get(url)
+    if not entry:
+        return None
+    rel_file, encoding = static_site.pick_encoding(entry, request.headers.get('accept-encoding'))
+    path = os.path.join(static_site.STATIC_DIR, rel_file)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        # removed or being rebuilt since the manifest was read; render live (or 404)
+        return None
+    headers = {'Vary': 'Accept-Encoding'}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    if cache_keys is not None:
+        if 'concept_id' in entry:
+            cache_keys = (*cache_keys, edge_cache.concept_key(entry['concept_id']))
+        headers.update(edge_cache.cache_headers(*cache_keys))
+    access_log.note(request.scope, cache='hit')
+    return FileResponse(path, media_type='text/html', headers=headers, stat_result=st)
+
+
+def refresh_static_concepts(changed=None, removed_id=None):
+    """Incrementally regenerate exported concept pages after an admin edit.
+
+    Call with the concepts file lock held; the manifest is re-read first because
+    another worker may have updated it.
+    """
+    global STATIC_MANIFEST, STATIC_MANIFEST_SIGNATURE
+    if static_manifest() is None:
+        return
+    STATIC_MANIFEST = static_site.load_manifest() or STATIC_MANIFEST
+    if changed is not None:
+        static_site.export_concept(STATIC_MANIFEST, changed)
+    if removed_id is not None:
+        static_site.remove_concept(STATIC_MANIFEST, removed_id)
+    static_site.save_manifest(STATIC_MANIFEST)
+    STATIC_MANIFEST_SIGNATURE = static_manifest_signature()
+
+
+def concepts_changed(changed=None, removed_id=None):
+    """Propagate a concept edit to the static export and to other workers."""
+    refresh_static_concepts(changed=changed, removed_id=removed_id)
+    BUS.publish('concepts')
+
+
+def on_concepts_changed(message):
+    global STATIC_MANIFEST_CHECKED
+    CONCEPTS.invalidate()
+    # re-check the export manifest on next use
+    STATIC_MANIFEST_CHECKED = 0.0
+
+
+def on_users_changed(message):
+    USERS.invalidate()
+
+
+def on_sessions_changed(message):
+    sessions.REVOCATIONS.refresh(force=True)
+
+
+BUS.subscribe('concepts', on_concepts_changed)
+BUS.subscribe('users', on_users_changed)
+BUS.subscribe('sessions', on_sessions_changed)
+
+
+SLUG_DROP = re.compile(r"[^a-z0-9\s-]")
+SLUG_SEPARATORS = re.compile(r"[\s_-]+")
+SLUG_EDGES = re.compile(r"^-+|-+$")
 
 
 def slugify(text: str):
     # simple slugify: lowercase, replace spaces with -, keep alphanum and -
-    import re
     s = text.lower().strip()
-    s = re.sub(r"[^a-z0-9\s-]", '', s)
-    s = re.sub(r"[\s_-]+", '-', s)
-    s = re.sub(r"^-+|-+$", '', s)
+    s = SLUG_DROP.sub('', s)
+    s = SLUG_SEPARATORS.sub('-', s)
+    s = SLUG_EDGES.sub('', s)
     return s
 
 
-def load_users():
-    with open(USERS_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-
-def save_users(users):
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2, ensure_ascii=False)
+def require_admin(request: Request):
+    return auth.is_admin(request.headers.get('X-Admin-Token') or request.query_params.get('token'))
 
 
-def require_admin(request: Request):
-    token = request.headers.get('X-Admin-Token') or request.query_params.get('token')
-    return token == ADMIN_TOKEN
+def request_token(request: Request):
+    """Return the user token from cookie, header or query string (in that order)."""
+    return (request.cookies.get('TA_USER_TOKEN')
+            or request.headers.get('X-User-Token')
+            or request.query_params.get('token'))
 
 
+@metrics.timed('get_user_from_request')
 def get_user_from_request(request: Request):
-    """Return the approved user dict if request contains a valid user token (cookie/header/query), else None."""
-    token = None
-    # cookie first
-    if request.cookies.get('TA_USER_TOKEN'):
-        token = request.cookies.get('TA_USER_TOKEN')
-    # header fallback
-    if not token:
-        token = request.headers.get('X-User-Token')
-    # query fallback
-    if not token:
-        token = request.query_params.get('token')
-    if not token:
-        return None
-    users = load_users()
-    for u in users:
-        if u.get('access_token') == token and u.get('status') == 'approved':
-            return u
-    return None
+    """Return the approved user for the request token, else None (see auth.user_for_token)."""
+    user = auth.user_for_token(request_token(request))
+    if user is not None:
+        access_log.note(request.scope, user=user['id'])
+    return user
 
 
 class RegisterModel(BaseModel):
@@ -108,21 +332,13 @@ class RegisterModel(BaseModel):
 
 @app.post('/api/register')
 async def register(payload: RegisterModel):
-    if not payload.name or not payload.email:
-        raise HTTPException(status_code=400, detail='name and email are required')
-
-    users = load_users()
-    user_id = str(uuid4())
-    user = {
-        'id': user_id,
-        'name': payload.name,
-        'email': payload.email,
-        'course': payload.course,
-        'status': 'pending',
-        'registered_at': datetime.utcnow().isoformat() + 'Z'
-    }
-    users.append(user)
-    save_users(users)
+    try:
+        # O(1) check against the store's normalized-email index
+        user_id = users.register(payload.name, payload.email, payload.course)
+    except user_store.DuplicateEmail:
+        raise HTTPException(status_code=409, detail='email already registered')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return JSONResponse(status_code=201, content={'message':'registered','id': user_id})
 
 
@@ -130,70 +346,56 @@ async def register(payload: RegisterModel):
 async def list_users(request: Request):
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
-    users = load_users()
-    return users
+    # the store keeps the serialized file bytes, so no per-request JSON encoding
+    return Response(content=USERS.raw(), media_type='application/json')
 
 
 @app.post('/api/users/{user_id}/approve')
 async def approve_user(user_id: str, request: Request):
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
-    users = load_users()
-    for u in users:
-        if u['id'] == user_id:
-            u['status'] = 'approved'
-            u['approved_at'] = datetime.utcnow().isoformat() + 'Z'
-            # generate an access token for approved user so they can login
-            u['access_token'] = str(uuid4())
-            save_users(users)
-            return {'message':'approved','id': user_id}
-    raise HTTPException(status_code=404, detail='user not found')
+    try:
+        users.approve(user_id)
+    except users.UserNotFound:
+        raise HTTPException(status_code=404, detail='user not found')
+    return {'message':'approved','id': user_id}
 
 
 @app.post('/api/users/{user_id}/reject')
 async def reject_user(user_id: str, request: Request):
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
-    users = load_users()
-    for u in users:
-        if u['id'] == user_id:
-            u['status'] = 'rejected'
-            u['rejected_at'] = datetime.utcnow().isoformat() + 'Z'
-            save_users(users)
-            return {'message':'rejected','id': user_id}
-    raise HTTPException(status_code=404, detail='user not found')
+    try:
+        users.reject(user_id)
+    except users.UserNotFound:
+        raise HTTPException(status_code=404, detail='user not found')
+    return {'message':'rejected','id': user_id}
 
 
 @app.post('/api/login')
 async def login(payload: dict, response: Response):
-    """Login with email. Only approved users can get an access token (set as cookie and returned).
+    """Login with email. Only approved users get a signed session token (set as cookie and returned).
 
     Body: { "email": "user@example.com" }
     Returns: { token, id, name }
     """
-    email = payload.get('email')
-    if not email:
-        raise HTTPException(status_code=400, detail='email required')
-    users = load_users()
-    for u in users:
-        if u.get('email') == email:
-            if u.get('status') != 'approved':
-                raise HTTPException(status_code=403, detail='user not approved')
-            token = u.get('access_token')
-            if not token:
-                # ensure token exists
-                token = str(uuid4())
-                u['access_token'] = token
-                save_users(users)
-            # set cookie for browser-based access
-            response.set_cookie(key='TA_USER_TOKEN', value=token, httponly=True)
-            return {'token': token, 'id': u['id'], 'name': u.get('name')}
-    raise HTTPException(status_code=404, detail='user not found')
+    try:
+        token, u = users.login(payload.get('email'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except users.UserNotFound:
+        raise HTTPException(status_code=404, detail='user not found')
+    except users.NotApproved:
+        raise HTTPException(status_code=403, detail='user not approved')
+    # set cookie for browser-based access
+    response.set_cookie(key='TA_USER_TOKEN', value=token, httponly=True, max_age=sessions.SESSION_TTL)
+    return {'token': token, 'id': u['id'], 'name': u.get('name')}
 
 
 @app.post('/api/logout')
-async def logout(response: Response):
-    """Clear the TA_USER_TOKEN cookie to log the user out."""
+async def logout(request: Request, response: Response):
+    """Revoke the session token and clear the TA_USER_TOKEN cookie to log the user out."""
+    users.logout(request_token(request))
     response.delete_cookie('TA_USER_TOKEN')
     return {'message': 'logged out'}
 
@@ -201,10 +403,17 @@ async def logout(response: Response):
 @app.get('/api/me')
 async def me(request: Request):
     user = get_user_from_request(request)
+    if not user:
+        raise HTTPException(status_code=401, detail='not logged in')
+    # session claims only carry id/name/status; fetch the full record
+    user = USERS.get(user['id'])
     if not user:
         raise HTTPException(status_code=401, detail='not logged in')
     # don't leak access token
     out = {k: v for k, v in user.items() if k != 'access_token'}
+    progress = get_progress().get(user['id'])
+    if progress:
+        out['progress'] = progress
     return out
 
 
@@ -229,16 +438,125 @@ async def update_progress(request: Request):
     if percent < 0 or percent > 100:
         raise HTTPException(status_code=400, detail='percent must be 0-100')
 
-    users = load_users()
-    for u in users:
-        if u['id'] == user['id']:
-            prog = u.get('progress', {})
-            prog[course] = percent
-            u['progress'] = prog
-            save_users(users)
-            return {'message': 'progress updated', 'progress': prog}
+    # in-place byte write in the progress matrix; users.json is not touched
+    try:
+        get_progress().set(user['id'], course, percent)
+    except progress_store.CourseLimitReached:
+        raise HTTPException(status_code=400, detail='too many distinct courses')
+    return {'message': 'progress updated', 'progress': get_progress().get(user['id'])}
+
+
+@app.get('/api/progress/{course}/summary')
+async def progress_summary(course: str, request: Request):
+    """Started/completed counts and mean percent for one course (admin only)."""
+    if not require_admin(request):
+        raise HTTPException(status_code=401, detail='admin token required')
+    return get_progress().summary(course)
+
+
+# Client-reported reading activity, e.g. a section scrolled into view:
+#   POST /api/events {"events": [{"page": "/pages/python.html", "section": "loops"}, ...]}
+# Events naming unknown pages or sections are ignored, so the counters stay bounded.
+MAX_EVENT_BATCH = 100
+
+
+def activity_key(event):
+    """Counter key for a client event, or None if it names no known page or section."""
+    if not isinstance(event, dict) or not isinstance(event.get('page'), str):
+        return None
+    url, section_id = event['page'], event.get('section')
+    if url.startswith('/pages/'):
+        page = PAGES.get(url[len('/pages/'):])
+        if page is None or page.media_type != 'text/html':
+            return None
+        points = page_points(page) if section_id else ()
+    elif url.startswith('/concepts/'):
+        concept = CONCEPTS.by_slug(url[len('/concepts/'):])
+        if concept is None:
+            return None
+        points = CONCEPTS.section_points(concept) if section_id else ()
+    else:
+        return None
+    if not section_id:
+        return url
+    if any(point['id'] == section_id for point in points):
+        return f'{url}#{section_id}'
+    return None
+
+
+@app.post('/api/events')
+async def post_events(request: Request):
+    """Accept a batch of reading events from a logged-in learner (202, or 503 when busy)."""
+    if auth.authorized_user_id(request_token(request)) is None:
+        raise HTTPException(status_code=401, detail='not logged in')
+    payload = await request.json()
+    events = payload.get('events') if isinstance(payload, dict) else None
+    if not isinstance(events, list) or not events:
+        raise HTTPException(status_code=400, detail='events list required')
+    if len(events) > MAX_EVENT_BATCH:
+        raise HTTPException(status_code=400, detail=f'at most {MAX_EVENT_BATCH} events per batch')
+    if not activity.ACTIVITY.reserve(len(events)):
+        # refuse the whole batch so the client can resend it unchanged
+        metrics.inc('ta_activity_rejected_batches_total', (),
+                    help_text='Event batches refused with 503 because the queue was full')
+        raise HTTPException(status_code=503, detail='busy, retry later', headers={'Retry-After': '1'})
+    keys = [key for key in map(activity_key, events) if key is not None]
+    for key in keys:
+        activity.ACTIVITY.record(key, source='client')
+    return JSONResponse(status_code=202, content={'accepted': len(keys), 'ignored': len(events) - len(keys)})
+
+
+@app.get('/api/activity')
+async def activity_summary(request: Request, days: int = 7):
+    """Views per page and section for the last ``days`` days (admin only)."""
+    if not require_admin(request):
+        raise HTTPException(status_code=401, detail='admin token required')
+    return activity.ACTIVITY.summary(max(1, min(days, activity.KEEP_DAYS)))
+
 
-    raise HTTPException(status_code=404, detail='user not found')
+@app.get('/metrics')
+async def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker's counters and histograms."""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.post('/api/admin/profile')
+async def start_profile(request: Request):
+    """Start a time-bounded sampling profile of this worker (admin only).
+
+    Query: ?seconds=10&interval_ms=5 (seconds capped at 60)
+    """
+    if not require_admin(request):
+        raise HTTPException(status_code=401, detail='admin token required')
+    try:
+        seconds = float(request.query_params.get('seconds', 10))
+        interval = float(request.query_params.get('interval_ms', 5)) / 1000
+    except ValueError:
+        raise HTTPException(status_code=400, detail='seconds and interval_ms must be numbers')
+    try:
+        running = profiler.PROFILER.start(seconds, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=202, content={'message': 'profiling', 'profile': running})
+
+
+@app.get('/api/admin/profile')
+async def profile_status(request: Request):
+    """Report the running profile and the last finished one for this worker."""
+    if not require_admin(request):
+        raise HTTPException(status_code=401, detail='admin token required')
+    return profiler.PROFILER.status()
+
+
+@app.get('/api/admin/profile/latest')
+async def download_profile(request: Request):
+    """Download the last collapsed-stack profile (feed to flamegraph.pl or speedscope)."""
+    if not require_admin(request):
+        raise HTTPException(status_code=401, detail='admin token required')
+    last = profiler.PROFILER.last
+    if not last:
+        raise HTTPException(status_code=404, detail='no finished profile')
+    return FileResponse(last['path'], media_type='text/plain', filename=os.path.basename(last['path']))
 
 
 @app.get('/data/users.json')
@@ -248,12 +566,19 @@ async def serve_users_file(request: Request):
     return FileResponse(USERS_FILE)
 
 
+@app.get('/data/concepts.json')
+async def serve_concepts_file():
+    """Concepts are public content; the raw file stays available as before."""
+    return FileResponse(CONCEPTS_FILE, media_type='application/json')
+
+
 @app.get('/api/concepts')
 async def list_concepts(request: Request):
     # admin-only listing for management
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
-    return load_concepts()
+    # the catalog keeps the file's JSON bytes; send them as-is
+    return Response(content=CONCEPTS.raw(), media_type='application/json')
 
 
 @app.post('/api/concepts')
@@ -263,25 +588,32 @@ async def create_concept(request: Request):
     payload = await request.json()
     title = payload.get('title')
     content = payload.get('content', '')
-    slug = payload.get('slug') or slugify(title or '')
     if not title:
         raise HTTPException(status_code=400, detail='title required')
-    concepts = load_concepts()
-    # ensure slug uniqueness
-    base = slug
-    i = 1
-    while any(c['slug'] == slug for c in concepts):
-        slug = f"{base}-{i}"
-        i += 1
-    concept = {
-        'id': str(uuid4()),
-        'title': title,
-        'slug': slug,
-        'content': content,
-        'created_at': datetime.utcnow().isoformat() + 'Z'
-    }
-    concepts.append(concept)
-    save_concepts(concepts)
+    # slugs become export file names and URLs: only [a-z0-9-] survive
+    slug = slugify(payload.get('slug') or title)
+    if not slug:
+        raise HTTPException(status_code=400, detail='invalid slug')
+    with CONCEPTS.transaction():
+        concepts = load_concepts()
+        # ensure slug uniqueness
+        base = slug
+        i = 1
+        while any(c['slug'] == slug for c in concepts):
+            slug = f"{base}-{i}"
+            i += 1
+        concept = {
+            'id': str(uuid4()),
+            'title': title,
+            'slug': slug,
+            'content': content,
+            'created_at': datetime.utcnow().isoformat() + 'Z'
+        }
+        concepts.append(concept)
+        save_concepts(concepts)
+        concepts_changed(changed=concept)
+        # the edge may hold a 404 for the new URL from before it existed
+        edge_cache.purge(keys=[edge_cache.INDEX_KEY], paths=[static_site.concept_url(slug)])
     return {'message': 'created', 'id': concept['id'], 'slug': slug}
 
 
@@ -290,17 +622,26 @@ async def update_concept(concept_id: str, request: Request):
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
     payload = await request.json()
-    concepts = load_concepts()
-    for c in concepts:
-        if c['id'] == concept_id:
-            c['title'] = payload.get('title', c.get('title'))
-            c['content'] = payload.get('content', c.get('content'))
-            # optional slug update
-            if payload.get('slug'):
-                c['slug'] = payload.get('slug')
-            c['updated_at'] = datetime.utcnow().isoformat() + 'Z'
-            save_concepts(concepts)
-            return {'message': 'updated', 'id': concept_id}
+    slug = slugify(payload['slug']) if payload.get('slug') else None
+    if slug == '':
+        raise HTTPException(status_code=400, detail='invalid slug')
+    with CONCEPTS.transaction():
+        concepts = load_concepts()
+        for c in concepts:
+            if c['id'] == concept_id:
+                c['title'] = payload.get('title', c.get('title'))
+                c['content'] = payload.get('content', c.get('content'))
+                # optional slug update
+                old_slug = c['slug']
+                if slug:
+                    c['slug'] = slug
+                c['updated_at'] = datetime.utcnow().isoformat() + 'Z'
+                save_concepts(concepts)
+                concepts_changed(changed=c)
+                edge_cache.purge(keys=[edge_cache.concept_key(concept_id)],
+                                 paths={static_site.concept_url(old_slug), static_site.concept_url(c['slug'])})
+                hot_cache.HOT.discard(static_site.concept_url(old_slug))
+                return {'message': 'updated', 'id': concept_id}
     raise HTTPException(status_code=404, detail='concept not found')
 
 
@@ -308,198 +649,255 @@ async def update_concept(concept_id: str, request: Request):
 async def delete_concept(concept_id: str, request: Request):
     if not require_admin(request):
         raise HTTPException(status_code=401, detail='admin token required')
-    concepts = load_concepts()
-    new = [c for c in concepts if c['id'] != concept_id]
-    if len(new) == len(concepts):
-        raise HTTPException(status_code=404, detail='concept not found')
-    save_concepts(new)
+    with CONCEPTS.transaction():
+        concepts = load_concepts()
+        new = [c for c in concepts if c['id'] != concept_id]
+        if len(new) == len(concepts):
+            raise HTTPException(status_code=404, detail='concept not found')
+        removed = next(c for c in concepts if c['id'] == concept_id)
+        save_concepts(new)
+        concepts_changed(removed_id=concept_id)
+        edge_cache.purge(keys=[edge_cache.concept_key(concept_id)],
+                         paths=[static_site.concept_url(removed['slug'])])
+        hot_cache.HOT.discard(static_site.concept_url(removed['slug']))
     return {'message': 'deleted', 'id': concept_id}
 
 
-@app.get('/')
-async def root():
-    """Serve the main index.html so visiting the server root shows the website."""
+# Section-level loading: a table of contents plus one <h2> section at a time, so
+# clients can show the start of a long guide before the rest arrives.
+@app.get('/api/concepts/{slug}/sections')
+async def concept_sections(slug: str):
+    concept = CONCEPTS.by_slug(slug)
+    if not concept:
+        raise HTTPException(status_code=404, detail='concept not found')
+    points = CONCEPTS.section_points(concept)
+    return JSONResponse({'slug': slug, 'title': concept.get('title'),
+                         'sections': sections.table_of_contents(points)},
+                        headers=edge_cache.concept_headers(concept['id']))
+
+
+@app.get('/api/concepts/{slug}/sections/{n}')
+async def concept_section(slug: str, n: int):
+    concept = CONCEPTS.by_slug(slug)
+    if not concept:
+        raise HTTPException(status_code=404, detail='concept not found')
+    try:
+        body = sections.section(concept.get('content') or '', CONCEPTS.section_points(concept), n)
+    except IndexError:
+        raise HTTPException(status_code=404, detail='section not found')
+    return Response(content=body, media_type='text/html', headers=edge_cache.concept_headers(concept['id']))
+
+
+def page_sections(page_path: str, request: Request):
+    """Return (text, split points) of a tutorial page the request may read."""
+    page = PAGES.get(page_path)
+    if page is None or page.media_type != 'text/html':
+        raise HTTPException(status_code=404, detail='page not found')
+    if not page.public and not get_user_from_request(request):
+        raise HTTPException(status_code=401, detail='approved user required')
+    text = page.text()
+    return text, page_points(page, text)
+
+
+def page_points(page, text=None):
+    if page.sections is None:
+        # computed once per file version; a changed file gets a new PageFile
+        page.sections = sections.page_points(page.text() if text is None else text)
+    return page.sections
+
+
+@app.get('/api/pages/{page_path:path}/sections')
+async def list_page_sections(page_path: str, request: Request):
+    _text, points = page_sections(page_path, request)
+    return {'page': page_path, 'sections': sections.table_of_contents(points)}
+
+
+@app.get('/api/pages/{page_path:path}/sections/{n}')
+async def page_section(page_path: str, n: int, request: Request):
+    text, points = page_sections(page_path, request)
+    try:
+        body = sections.section(text, points, n)
+    except IndexError:
+        raise HTTPException(status_code=404, detail='section not found')
+    return Response(content=body, media_type='text/html')
+
+
+def index_response(request: Request):
+    exported = static_response('/index.html', request, cache_keys=(edge_cache.INDEX_KEY,))
+    if exported is not None:
+        return exported
     index_path = os.path.join(BASE_DIR, 'index.html')
     if os.path.exists(index_path):
-        return FileResponse(index_path, media_type='text/html')
+        access_log.note(request.scope, cache='miss')
+        return FileResponse(index_path, media_type='text/html', headers=edge_cache.cache_headers(edge_cache.INDEX_KEY))
     return JSONResponse({'message': 'Index file not found'}, status_code=404)
 
 
+@app.get('/')
+async def root(request: Request):
+    """Serve the main index.html so visiting the server root shows the website."""
+    return index_response(request)
+
+
 @app.get('/index.html')
-async def index_html():
+async def index_html(request: Request):
     """Serve index.html when requested explicitly (e.g. clicking Home -> index.html)."""
-    index_path = os.path.join(BASE_DIR, 'index.html')
-    if os.path.exists(index_path):
-        return FileResponse(index_path, media_type='text/html')
-    return JSONResponse({'message': 'Index file not found'}, status_code=404)
+    return index_response(request)
 
 
 @app.get('/index')
-async def index_redirect():
+async def index_redirect(request: Request):
     """Redirect friendly /index to root."""
-    index_path = os.path.join(BASE_DIR, 'index.html')
-    if os.path.exists(index_path):
-        return FileResponse(index_path, media_type='text/html')
-    return JSONResponse({'message': 'Index file not found'}, status_code=404)
+    return index_response(request)
 
 
 # Serve pages with authorization: registration and admin pages are public, other pages
-# require an approved user (with a valid access token). If unauthorized, return index.html
-# so only home content is visible.
-@app.get('/pages/{page_path:path}')
-async def serve_page(page_path: str, request: Request):
-    page_file = os.path.join(BASE_DIR, 'pages', page_path)
-    # Prevent path traversal
-    if not os.path.abspath(page_file).startswith(os.path.abspath(os.path.join(BASE_DIR, 'pages'))):
-        raise HTTPException(status_code=400, detail='invalid path')
-    if not os.path.exists(page_file):
+# require an approved user (with a valid access token). Authorization and delivery are
+# separate steps: protected content is the same for every approved user, so the check
+# is a cached token validation (auth.authorized_user_id, no user record is built) and the
+# response is the registry's shared copy. Both outcomes are marked private and vary on
+# the credentials, so a browser reuses the page, or the login redirect, until it logs
+# in or out.
+PROTECTED_PAGE_HEADERS = {'Cache-Control': f'private, max-age={edge_cache.BROWSER_MAX_AGE}',
+                          'Vary': 'Cookie, X-User-Token'}
+LOGIN_REDIRECTS = {}  # page path -> login URL with ?next=
+# HTML pages may be sent compressed from the hot cache, so they also vary on Accept-Encoding;
+# keyed by (protected, HTML)
+PAGE_HEADERS = {(False, False): None,
+                (False, True): {'Vary': 'Accept-Encoding'},
+                (True, False): PROTECTED_PAGE_HEADERS,
+                (True, True): {**PROTECTED_PAGE_HEADERS, 'Vary': 'Accept-Encoding, Cookie, X-User-Token'}}
+
+
+def login_redirect(page_path: str):
+    url = LOGIN_REDIRECTS.get(page_path)
+    if url is None:
+        url = LOGIN_REDIRECTS[page_path] = f'/pages/login.html?next=/pages/{page_path}'
+    return RedirectResponse(url=url, headers=PROTECTED_PAGE_HEADERS)
+
+
+def record_view(page, page_path: str):
+    if page.media_type == 'text/html':
+        activity.ACTIVITY.record(f'/pages/{page_path}')
+
+
+def compressed_page(page, encoding):
+    body = page.body
+    if body is None:
+        with open(page.path, 'rb') as f:
+            body = f.read()
+    return hot_cache.encode(body, encoding)
+
+
+async def page_response(request: Request, page, protected: bool):
+    """Send a registry page; often read HTML pages go out compressed from the hot cache."""
+    html = page.media_type == 'text/html'
+    headers = PAGE_HEADERS[protected, html]
+    hot = hot_cache.HOT
+    body = None
+    encoding = hot_cache.negotiate(request.headers.get('accept-encoding')) if html and hot.enabled else None
+    if encoding is not None and 'range' not in request.headers:
+        url = f'/pages/{page.name}'
+        body, cache = hot.get(url, encoding, page.etag), 'hit'
+        if body is None and hot.admits(url):
+            body, cache = await asyncio.to_thread(compressed_page, page, encoding), 'miss'
+            hot.put(url, encoding, page.etag, body)
+    if body is None:
+        # pages small enough to keep in memory are hits; larger ones are read per request
+        access_log.note(request.scope, cache='miss' if page.body is None else 'hit')
+        return page_files.PageFileResponse(page, headers=headers)
+
+    access_log.note(request.scope, cache=cache)
+    etag = f'{page.etag[:-1]}-{encoding}"'
+    headers = {**headers, 'ETag': etag, 'Last-Modified': page.last_modified}
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers=headers)
+    headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='text/html', headers=headers)
+
+
+async def serve_page(request: Request):
+    # Only files known to the registry can be served, which also rules out path traversal
+    page_path = request.path_params['page_path']
+    page = PAGES.get(page_path)
+    if page is None:
         raise HTTPException(status_code=404, detail='page not found')
 
-    public_pages = ('register.html', 'admin.html', 'login.html')
-    if os.path.basename(page_file) in public_pages:
-        return FileResponse(page_file, media_type='text/html')
+    if page.public:
+        record_view(page, page_path)
+        return await page_response(request, page, protected=False)
 
-    user = get_user_from_request(request)
-    if not user:
+    user_id = auth.authorized_user_id(request_token(request))
+    if user_id is None:
         # Not authorized to view inner pages — redirect to login and include next
-        next_url = f"/pages/{page_path}"
-        login_url = f"/pages/login.html?next={next_url}"
-        return RedirectResponse(url=login_url)
+        return login_redirect(page_path)
+    access_log.note(request.scope, user=user_id)
+    record_view(page, page_path)
+    return await page_response(request, page, protected=True)
+
+
+class PageRoute(Route):
+    """A Route that records itself in the scope, as FastAPI routes do, for metrics and logs."""
+
+    def matches(self, scope):
+        match, child_scope = super().matches(scope)
+        if match is not Match.NONE:
+            child_scope['route'] = self
+        return match, child_scope
 
-    # authorized — serve requested page
-    return FileResponse(page_file, media_type='text/html')
+
+# A plain Starlette route, since the handler needs no FastAPI parameter parsing, and
+# the first one: page views are the busiest requests and no other route can match
+# /pages/..., so they skip matching against every API route (about 4x throughput).
+app.router.routes.insert(0, PageRoute('/pages/{page_path:path}', serve_page, methods=['GET']))
+
+
+# Live concept pages are streamed: the head and header go out before the body,
+# which follows one <h2> section per chunk. TA_STREAM_CONCEPTS=0 renders them whole.
+STREAM_CONCEPTS = os.environ.get('TA_STREAM_CONCEPTS', '1') not in ('', '0')
+
+
+async def stream_concept(concept):
+    points = CONCEPTS.section_points(concept)
+    for chunk in iter_concept(concept, points):
+        yield chunk.encode('utf-8')
 
 
 @app.get('/concepts/{slug}')
 async def serve_concept(slug: str, request: Request):
-        """Serve concept content to all users (public access)."""
-        # find concept
-        concepts = load_concepts()
-        match = None
-        for c in concepts:
-                if c.get('slug') == slug:
-                        match = c
-                        break
-        if not match:
-                raise HTTPException(status_code=404, detail='concept not found')
-
-        # render a rich HTML page for the concept with enhanced styling
-        html = f"""<!doctype html>
-<html>
-<head>
-    <meta charset='utf-8' />
-    <meta name='viewport' content='width=device-width,initial-scale=1' />
-    <title>{match.get('title')}</title>
-    <link rel='stylesheet' href='/assets/css/style.css'>
-    <style>
-        .concept-page {{
-            max-width: 1000px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .concept-header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 40px 20px;
-            border-radius: 8px;
-            margin-bottom: 40px;
-        }}
-        .concept-header h1 {{
-            margin: 0;
-            font-size: 2.5rem;
-        }}
-        .concept-content {{
-            background: white;
-            padding: 30px;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-            line-height: 1.8;
-        }}
-        .concept-content h2 {{
-            color: #667eea;
-            margin-top: 40px;
-            padding-top: 20px;
-            border-top: 2px solid #f0f0f0;
-        }}
-        .concept-content h3 {{
-            color: #764ba2;
-            margin-top: 25px;
-        }}
-        .concept-content pre {{
-            background: #f5f5f5;
-            padding: 15px;
-            border-radius: 6px;
-            border-left: 4px solid #667eea;
-            overflow-x: auto;
-        }}
-        .concept-content code {{
-            font-family: 'Courier New', monospace;
-            font-size: 0.95rem;
-        }}
-        .concept-content ul {{
-            padding-left: 25px;
-        }}
-        .concept-content li {{
-            margin-bottom: 10px;
-        }}
-        .concept-content a {{
-            color: #667eea;
-            text-decoration: none;
-        }}
-        .concept-content a:hover {{
-            text-decoration: underline;
-        }}
-        .breadcrumb {{
-            margin-bottom: 20px;
-            font-size: 0.9rem;
-        }}
-        .breadcrumb a {{
-            color: #667eea;
-            margin-right: 10px;
-        }}
-        .back-button {{
-            display: inline-block;
-            background: #667eea;
-            color: white;
-            padding: 10px 20px;
-            border-radius: 6px;
-            text-decoration: none;
-            margin-bottom: 20px;
-        }}
-        .back-button:hover {{
-            background: #764ba2;
-        }}
-    </style>
-</head>
-<body>
-    <header>
-        <nav>
-            <div class='logo'>🚀 Test Automation Hub</div>
-            <ul class='nav-menu'>
-                <li><a href='/index.html'>Home</a></li>
-                <li><a href='/pages/login.html'>Login</a></li>
-            </ul>
-        </nav>
-    </header>
-
-    <div class='concept-page'>
-        <a href='/index.html' class='back-button'>← Back to Home</a>
-        
-        <div class='concept-header'>
-            <h1>{match.get('title')}</h1>
-            <p style='margin: 10px 0 0 0; font-size: 1.1rem;'>Comprehensive tutorial with examples and best practices</p>
-        </div>
-
-        <div class='concept-content'>
-            {match.get('content')}
-        </div>
-
-        <div style='margin-top: 40px; padding-top: 20px; border-top: 2px solid #f0f0f0; text-align: center; color: #999; font-size: 0.9rem;'>
-            <p>Last updated: {match.get('updated_at', 'N/A')}</p>
-            <p>© 2025 Test Automation Hub. All rights reserved.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return Response(content=html, media_type='text/html')
+    """Serve concept content to all users (public access)."""
+    exported = static_response(static_site.concept_url(slug), request, cache_keys=(edge_cache.CONCEPTS_KEY,))
+    if exported is not None:
+        activity.ACTIVITY.record(f'/concepts/{slug}')
+        return exported
+
+    match = CONCEPTS.by_slug(slug)
+    if not match:
+        raise HTTPException(status_code=404, detail='concept not found')
+    activity.ACTIVITY.record(f'/concepts/{slug}')
+    headers = {**edge_cache.concept_headers(match['id']), 'Vary': 'Accept-Encoding'}
+
+    # Often read concepts are rendered and compressed once into the hot cache
+    url, version = static_site.concept_url(slug), CONCEPTS.version
+    hot = hot_cache.HOT
+    encoding = hot_cache.negotiate(request.headers.get('accept-encoding'))
+    body = hot.get(url, encoding, version) if hot.enabled else None
+    cache = 'hit'
+    if body is None and hot.admits(url):
+        with metrics.timer('render_concept'):
+            html = render_concept(match)
+        body, cache = await asyncio.to_thread(hot_cache.encode, html.encode('utf-8'), encoding), 'miss'
+        hot.put(url, encoding, version, body)
+    if body is not None:
+        access_log.note(request.scope, cache=cache)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(content=body, media_type='text/html', headers=headers)
+
+    # render a rich HTML page for the concept with enhanced styling
+    access_log.note(request.scope, cache='miss')
+    if not STREAM_CONCEPTS:
+        with metrics.timer('render_concept'):
+            html = render_concept(match)
+        return Response(content=html, media_type='text/html', headers=headers)
+    return StreamingResponse(stream_concept(match), media_type='text/html', headers=headers)
@@ -0,0 +1,193 @@
+"""HMAC-signed stateless session tokens.
+
+A session token carries the user id, name, status and expiry, signed with
+``TA_SESSION_SECRET``. Verifying one is pure CPU work, so protected pages can
+be authorized without reading the user store, and any worker or node sharing
+the secret accepts it.
+
+Revocation is handled by a small list persisted next to the user store:
+individual tokens (logout) are kept until they expire, and rejecting a user
+revokes every token issued to them before that moment. Other workers pick up
+revocations by re-checking the file at most every ``REVOCATION_REFRESH``
+seconds.
+
+Token layout: ``v1.<base64url payload>.<base64url signature>``.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+
+from core.storage import DATA_DIR
+import jsonio
+
+SECRET_FILE = os.path.join(DATA_DIR, 'session_secret')
+REVOKED_FILE = os.path.join(DATA_DIR, 'revoked_sessions.json')
+SESSION_TTL = int(os.environ.get('TA_SESSION_TTL', 7 * 24 * 3600))
+REVOCATION_REFRESH = 2.0
+VERSION = 'v1'
+
+
+def _load_secret():
+    secret = os.environ.get('TA_SESSION_SECRET')
+    if secret:
+        return secret.encode('utf-8')
+    # Single-host default: share one generated secret between all workers via a file.
+    # Multi-node deployments must set TA_SESSION_SECRET explicitly.
+    os.makedirs(DATA_DIR, exist_ok=True)
+    try:
+        with open(SECRET_FILE, 'rb') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    value = secrets.token_hex(32).encode('ascii')
+    try:
+        fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # another worker won the race
+        with open(SECRET_FILE, 'rb') as f:
+            return f.read().strip()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(value)
+    return value
+
+
+SECRET = None  # read or generated by get_secret() on first use
+
+
+def get_secret():
+    global SECRET
+    if SECRET is None:
+        SECRET = _load_secret()
+    return SECRET
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(message):
+    return _b64encode(hmac.new(get_secret(), message.encode('ascii'), hashlib.sha256).digest())
+
+
+def is_session_token(token):
+    return token.startswith(VERSION + '.')
+
+
+def issue_session(user, ttl=SESSION_TTL):
+    """Return a signed token for an approved user dict."""
+    now_ms = int(time.time() * 1000)
+    claims = {
+        'uid': user['id'],
+        'name': user.get('name'),
+        'st': user.get('status'),
+        'iat': now_ms,
+        'exp': now_ms // 1000 + ttl,
+        'jti': secrets.token_urlsafe(9),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    message = f'{VERSION}.{payload}'
+    return f'{message}.{_sign(message)}'
+
+
+def decode_session(token):
+    """Return the claims of a correctly signed, unexpired token, else None."""
+    try:
+        version, payload, signature = token.split('.')
+    except ValueError:
+        return None
+    if version != VERSION or not hmac.compare_digest(signature, _sign(f'{version}.{payload}')):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get('exp', 0) < time.time():
+        return None
+    return claims
+
+
+def verify_session(token):
+    """Return claims for a valid, unrevoked token of an approved user, else None."""
+    claims = decode_session(token)
+    if claims is None or claims.get('st') != 'approved':
+        return None
+    if REVOCATIONS.is_revoked(claims):
+        return None
+    return claims
+
+
+class RevocationList:
+    """Revoked token ids and per-user revocation times, shared through a JSON file."""
+
+    def __init__(self, path=REVOKED_FILE):
+        self.path = path
+        self.tokens = {}  # jti -> exp (seconds)
+        self.users = {}  # uid -> revoked at (ms); tokens issued earlier are invalid
+        self._mtime = None
+        self._checked = float('-inf')  # so the first lookup reads the file
+        self.generation = 0  # bumped on every change, for caches of verified tokens
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked < REVOCATION_REFRESH:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.tokens = data.get('tokens', {})
+        self.users = data.get('users', {})
+        self._mtime = mtime
+        self.generation += 1
+
+    def is_revoked(self, claims):
+        self.refresh()
+        if claims.get('jti') in self.tokens:
+            return True
+        revoked_at = self.users.get(claims.get('uid'))
+        return revoked_at is not None and claims.get('iat', 0) <= revoked_at
+
+    def _save(self):
+        now = time.time()
+        # expired tokens are rejected anyway, so drop them to keep the list small
+        self.tokens = {jti: exp for jti, exp in self.tokens.items() if exp >= now}
+        oldest = (now - SESSION_TTL) * 1000
+        self.users = {uid: at for uid, at in self.users.items() if at >= oldest}
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'tokens': self.tokens, 'users': self.users}, f)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self.generation += 1
+
+    def revoke_token(self, token):
+        claims = decode_session(token)
+        if claims is None:
+            return False
+        with jsonio.locked(self.path):
+            self.refresh(force=True)
+            self.tokens[claims['jti']] = claims['exp']
+            self._save()
+        return True
+
+    def revoke_user(self, user_id):
+        with jsonio.locked(self.path):
+            self.refresh(force=True)
+            self.users[user_id] = int(time.time() * 1000)
+            self._save()
+
+
+REVOCATIONS = RevocationList()
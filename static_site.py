@@ -0,0 +1,318 @@
+"""Static export of the public concept pages.
+
+Usage:
+    python static_site.py build-static [--out DIR]
+    python static_site.py build-assets [--out DIR]
+
+``build-static`` renders every ``/concepts/{slug}`` page plus ``index.html``
+into ``DIR`` (default ``static_build/`` or ``$TA_STATIC_DIR``), writes
+precompressed ``.gz`` (and ``.br`` when the ``brotli`` package is installed)
+siblings and a ``manifest.json`` describing every file. ``server_fastapi.py``
+serves these files directly when the manifest exists, and a front proxy can
+serve the same tree without touching Python.
+
+Both commands first fingerprint the CSS/JS (see ``asset_bundle.py``) and
+write copies of ``getting-started.html`` and ``pages/*.html`` whose asset
+references point at the hashed URLs, with the above-the-fold CSS for their
+page type inlined and scripts deferred (see ``critical_css.py``); the page
+registry serves those copies in preference to the sources. ``build-assets``
+does only that part.
+
+Only public content goes into ``DIR``. Copies of login-protected pages are
+written to ``$TA_PRIVATE_DIR`` (default ``private_build/``), which must never
+be served directly: the app serves them after its token check.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import asset_bundle
+import critical_css
+import page_files
+from rendering import render_concept
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.environ.get('TA_STATIC_DIR', os.path.join(BASE_DIR, 'static_build'))
+PRIVATE_DIR = os.environ.get('TA_PRIVATE_DIR', os.path.join(BASE_DIR, 'private_build'))
+DATA_DIR = os.environ.get('TA_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+CONCEPTS_FILE = os.path.join(DATA_DIR, 'concepts.json')
+MANIFEST_NAME = 'manifest.json'
+
+# encodings in order of preference when negotiating with Accept-Encoding
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def load_manifest(out_dir=STATIC_DIR):
+    """Return the manifest dict for an exported tree, or None if not built."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_manifest(manifest, out_dir=STATIC_DIR):
+    manifest['generated_at'] = datetime.utcnow().isoformat() + 'Z'
+    data = json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8')
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME), data)
+
+
+def export_path(out_dir, rel_file):
+    """Absolute path of ``rel_file`` in the export tree; refuses anything outside it."""
+    root = os.path.realpath(out_dir)
+    path = os.path.realpath(os.path.join(root, rel_file))
+    if os.path.commonpath((root, path)) != root:
+        raise ValueError(f'{rel_file!r} is outside the export directory')
+    return path
+
+
+def write_entry(manifest, url, rel_file, body, out_dir=STATIC_DIR, **extra):
+    """Write ``body`` and its compressed siblings, recording them under ``url``.
+
+    Files whose content hash is unchanged are left untouched so incremental
+    rebuilds only rewrite what actually changed.
+    """
+    etag = hashlib.sha1(body).hexdigest()
+    old = manifest['files'].get(url)
+    if old and old['etag'] == etag and old['file'] == rel_file:
+        old.update(extra)
+        return False
+    if old and old['file'] != rel_file:
+        remove_entry(manifest, url, out_dir)
+
+    path = export_path(out_dir, rel_file)
+    _write_atomic(path, body)
+    encodings = {}
+    _write_atomic(path + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+    encodings['gzip'] = rel_file + '.gz'
+    if brotli is not None:
+        _write_atomic(path + '.br', brotli.compress(body))
+        encodings['br'] = rel_file + '.br'
+    manifest['files'][url] = dict(
+        file=rel_file, etag=etag, size=len(body), encodings=encodings, **extra)
+    return True
+
+
+def remove_entry(manifest, url, out_dir=STATIC_DIR):
+    entry = manifest['files'].pop(url, None)
+    if not entry:
+        return False
+    _remove_quietly(os.path.join(out_dir, entry['file']))
+    for rel in entry.get('encodings', {}).values():
+        _remove_quietly(os.path.join(out_dir, rel))
+    return True
+
+
+def concept_url(slug):
+    return f'/concepts/{slug}'
+
+
+def export_concept(manifest, concept, out_dir=STATIC_DIR):
+    """Render one concept into the export tree, dropping any stale slug."""
+    for url, entry in list(manifest['files'].items()):
+        if entry.get('concept_id') == concept['id'] and url != concept_url(concept['slug']):
+            remove_entry(manifest, url, out_dir)
+    body = render_concept(concept).encode('utf-8')
+    return write_entry(manifest, concept_url(concept['slug']),
+                       f"concepts/{concept['slug']}.html", body, out_dir,
+                       concept_id=concept['id'])
+
+
+def remove_concept(manifest, concept_id, out_dir=STATIC_DIR):
+    removed = False
+    for url, entry in list(manifest['files'].items()):
+        if entry.get('concept_id') == concept_id:
+            removed = remove_entry(manifest, url, out_dir) or removed
+    return removed
+
+
+def site_pages():
+    """Relative paths of the hand-written HTML pages."""
+    names = ['getting-started.html']
+    names += [f'pages/{name}' for name in sorted(os.listdir(os.path.join(BASE_DIR, 'pages')))
+              if name.endswith('.html')]
+    return names
+
+
+def _read_source(rel_path):
+    with open(os.path.join(BASE_DIR, rel_path), 'r', encoding='utf-8') as f:
+        return asset_bundle.rewrite_html(f.read())
+
+
+def read_page(rel_path):
+    """Return a site HTML file with hashed asset URLs, critical CSS inlined and scripts deferred."""
+    critical = asset_bundle.critical_for(critical_css.page_type(rel_path))
+    return critical_css.optimize_page(_read_source(rel_path), critical).encode('utf-8')
+
+
+def compute_critical(concepts=()):
+    """Above-the-fold CSS for every page type, from the pages of that type.
+
+    Each type gets the rules of the stylesheets its pages link (in link
+    order) that may match anything in the first screen of any of them.
+    """
+    hrefs = {t: [] for t in critical_css.PAGE_TYPES}
+    tokens = {t: set() for t in critical_css.PAGE_TYPES}
+    samples = [(critical_css.page_type(rel), _read_source(rel)) for rel in ['index.html'] + site_pages()]
+    # the empty concept covers the page chrome when there are no concepts yet
+    samples += [('concept', render_concept(c)) for c in [{'title': '', 'content': ''}, *concepts]]
+    for kind, html in samples:
+        hrefs[kind] += [h for h in critical_css.stylesheet_hrefs(html) if h not in hrefs[kind]]
+        tokens[kind] |= critical_css.fold_tokens(html)
+    critical = {}
+    for kind in critical_css.PAGE_TYPES:
+        css = ''.join(asset_bundle.asset_text(href) for href in hrefs[kind])
+        critical[kind] = critical_css.extract(css, tokens[kind])
+    return critical
+
+
+def is_protected(rel_path):
+    """True for site pages only approved users may read (see ``page_files.PUBLIC_PAGES``)."""
+    return rel_path.startswith('pages/') and os.path.basename(rel_path) not in page_files.PUBLIC_PAGES
+
+
+def export_pages(out_dir=STATIC_DIR, private_dir=PRIVATE_DIR):
+    """Write optimized copies of the tutorial pages; returns how many changed.
+
+    Protected pages go to ``private_dir`` so the public tree never holds them.
+    """
+    written = 0
+    for rel_path in site_pages():
+        body = read_page(rel_path)
+        target, other = (private_dir, out_dir) if is_protected(rel_path) else (out_dir, private_dir)
+        _remove_quietly(os.path.join(other, rel_path))  # left by an earlier build
+        path = os.path.join(target, rel_path)
+        try:
+            with open(path, 'rb') as f:
+                if f.read() == body:
+                    continue
+        except FileNotFoundError:
+            pass
+        _write_atomic(path, body)
+        written += 1
+    return written
+
+
+def build_assets(out_dir=STATIC_DIR, concepts=None, private_dir=PRIVATE_DIR):
+    """Fingerprint CSS/JS, extract critical CSS and rewrite the pages.
+
+    Returns (asset manifest, pages written).
+    """
+    if concepts is None:
+        try:
+            with open(CONCEPTS_FILE, 'r', encoding='utf-8') as f:
+                concepts = json.load(f)
+        except FileNotFoundError:
+            concepts = []
+    assets = asset_bundle.build_assets()
+    assets['critical'] = compute_critical(concepts)
+    asset_bundle.save_manifest(assets)
+    return assets, export_pages(out_dir, private_dir)
+
+
+def build_static(concepts, out_dir=STATIC_DIR):
+    """Export the index and every concept; returns (manifest, written count)."""
+    build_assets(out_dir, concepts)
+    manifest = load_manifest(out_dir) or {'files': {}}
+    written = 0
+    written += write_entry(manifest, '/index.html', 'index.html', read_page('index.html'), out_dir)
+    live = set()
+    for concept in concepts:
+        live.add(concept['id'])
+        written += export_concept(manifest, concept, out_dir)
+    for url, entry in list(manifest['files'].items()):
+        if 'concept_id' in entry and entry['concept_id'] not in live:
+            remove_entry(manifest, url, out_dir)
+    save_manifest(manifest, out_dir)
+    return manifest, written
+
+
+def accepted_encodings(accept_encoding):
+    """``{coding: q}`` from an Accept-Encoding header; a malformed q counts as 0."""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        name, *params = item.split(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding, available):
+    """The coding from ``available`` (in preference order) the client weights highest, or None.
+
+    ``q=0`` refuses a coding, and ``*`` stands for codings not listed.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    best, best_q = None, 0.0
+    for name in available:
+        q = accepted.get(name, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def pick_encoding(entry, accept_encoding):
+    """Return (relative file, content-encoding or None) for a manifest entry."""
+    encodings = entry.get('encodings', {})
+    name = choose_encoding(accept_encoding, [name for name, _suffix in ENCODINGS if name in encodings])
+    if name is None:
+        return entry['file'], None
+    return encodings[name], name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Static export of concept pages')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build-static', help='render all concept pages to disk')
+    build.add_argument('--out', default=STATIC_DIR, help='output directory')
+    assets = sub.add_parser('build-assets', help='fingerprint CSS/JS and rewrite page references')
+    assets.add_argument('--out', default=STATIC_DIR, help='output directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build-assets':
+        asset_manifest, pages = build_assets(args.out)
+        print(f"✓ {len(asset_manifest['files'])} assets fingerprinted in {asset_bundle.DIST_DIR}, "
+              f"{pages} pages rewritten in {args.out}")
+        return
+
+    with open(CONCEPTS_FILE, 'r', encoding='utf-8') as f:
+        concepts = json.load(f)
+    manifest, written = build_static(concepts, args.out)
+    print(f"✓ {len(manifest['files'])} pages exported to {args.out} ({written} rewritten)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""In-memory user store backed by ``data/users.json``.
+
+Keeps the parsed user list resident together with indexes by id, access token
+and normalized email (stripped and case-folded), so registration can reject
+duplicate emails and login can find a user in O(1). The file is re-read only
+when its mtime or size changes, which keeps ``server.py`` and
+``server_fastapi.py`` consistent when both run against the same file.
+Writers go through ``transaction()``, which holds a cross-process file lock
+around reload, edit and save.
+
+With ``revalidate_after`` set (multi-worker mode, where the bus announces
+changes), the mtime check runs at most that often and ``invalidate()``
+forces the next access to reload.
+
+Users are held as compact ``records.UserRecord`` objects, which support the
+dict-style access the endpoints use. ``all()`` returns the live list; callers that mutate records must call
+``save()`` afterwards so the file and indexes stay in step. ``raw()`` returns
+the JSON bytes last read or written, so admin listings need no re-encoding.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import jsonio
+import metrics
+from records import UserRecord
+
+
+class DuplicateEmail(ValueError):
+    """Raised when registering an email that already has an account."""
+
+
+def normalize_email(email):
+    return (email or '').strip().casefold()
+
+
+class UserStore:
+    def __init__(self, path, revalidate_after=0.0):
+        self.path = path
+        self.revalidate_after = revalidate_after
+        self._checked = 0.0
+        self._users = []
+        self._by_id = {}
+        self._by_email = {}
+        self._by_token = {}
+        self._raw = b'[]'
+        self._signature = None
+
+    def ensure_file(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not os.path.exists(self.path):
+            jsonio.write_file(self.path, [])
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.ensure_file()  # created on first use rather than at import
+            st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def invalidate(self):
+        self._checked = 0.0
+
+    def _refresh(self, force=False):
+        if self.revalidate_after and not force:
+            now = time.monotonic()
+            if now - self._checked < self.revalidate_after:
+                return
+            self._checked = now
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        with metrics.timer('load_users'):
+            users, self._raw = jsonio.read_file(self.path)
+            self._users = [UserRecord(u) for u in users]
+        self._signature = signature
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {}
+        self._by_email = {}
+        self._by_token = {}
+        for u in self._users:
+            self._by_id.setdefault(u.get('id'), u)
+            # first record wins for pre-existing duplicates, matching the old scan order
+            self._by_email.setdefault(normalize_email(u.get('email')), u)
+            if u.get('access_token'):
+                self._by_token[u['access_token']] = u
+
+    def all(self):
+        self._refresh()
+        return self._users
+
+    def raw(self):
+        self._refresh()
+        return self._raw
+
+    def get(self, user_id):
+        self._refresh()
+        return self._by_id.get(user_id)
+
+    def find_by_email(self, email):
+        self._refresh()
+        return self._by_email.get(normalize_email(email))
+
+    def find_by_token(self, token):
+        self._refresh()
+        return self._by_token.get(token)
+
+    @contextmanager
+    def transaction(self):
+        """Lock, reload if changed, let the caller edit records, then save.
+
+        Nothing is written if the body raises.
+        """
+        with jsonio.locked(self.path):
+            self._refresh(force=True)
+            yield self
+            self.save()
+
+    def add(self, user):
+        """Append a new user and persist; raises DuplicateEmail if the email is taken."""
+        with self.transaction():
+            key = normalize_email(user.get('email'))
+            if key in self._by_email:
+                raise DuplicateEmail(user.get('email'))
+            self._users.append(user if isinstance(user, UserRecord) else UserRecord(user))
+
+    def save(self, users=None):
+        """Persist ``users`` (or the live list after in-place edits) and rebuild indexes."""
+        if users is not None:
+            self._users = [u if isinstance(u, UserRecord) else UserRecord(u) for u in users]
+        with metrics.timer('save_users'):
+            self._raw = jsonio.write_file(self.path, [u.to_dict() for u in self._users])
+        self._signature = self._stat()
+        self._reindex()